@@ -0,0 +1,380 @@
+
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+from bs4 import BeautifulSoup as bs
+from schedule import ROUNDS, re_link
+from metrics import METRICS
+import threading
+import platform
+import time
+import tqdm
+from selenium import webdriver
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, only the memory cap needs it
+    psutil = None
+
+GAME_CENTER_URL = (
+    "https://www.euroleaguebasketball.net/euroleague/game-center/"
+)
+GROUP_TITLE_CLASS = "game-center-group_groupTitle__5RCk4"
+
+
+def create_driver(headless: bool = True) -> WebDriver:
+    """Starts a new browser, Firefox on Windows and Chrome everywhere else
+
+    Args:
+        headless (bool): run Chrome without a window
+
+    Returns:
+        WebDriver: the started driver, has to be quit by the caller
+    """
+    if platform.system() == "Windows":
+        from webdriver_manager.firefox import GeckoDriverManager
+        return webdriver.Firefox(
+            service=Service(GeckoDriverManager().install())
+        )
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    options = Options()
+    if headless:
+        options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()),
+        options=options
+    )
+
+
+def accept_cookies(driver: WebDriver, delay: float = 10) -> None:
+    eu_url = "https://www.euroleaguebasketball.net/euroleague/"
+
+    driver.get(eu_url)
+    element = (
+        WebDriverWait(driver, delay)
+        .until(lambda x: x.find_element(By.ID, "onetrust-accept-btn-handler"))
+    )
+    element.click()
+
+
+@contextmanager
+def browser(headless: bool = True) -> Iterator[WebDriver]:
+    """Context manager that starts a browser on entering, accepts the
+    cookies once and quits the browser on exit, also if an error occurred.
+    The driver can be reused for several seasons inside the block.
+
+    Args:
+        headless (bool): run Chrome without a window
+
+    Yields:
+        WebDriver: driver ready to load game center pages
+    """
+    driver = create_driver(headless)
+    try:
+        accept_cookies(driver)
+        yield driver
+    finally:
+        driver.quit()
+
+
+def assert_round(driver, season, round):
+    elm = driver.find_elements(
+        By.CLASS_NAME, "game-center-select-shared_selectedValue__4xru_"
+    )
+    corr_season = False
+    corr_round = False
+    for s in elm:
+        if s.get_attribute("aria-labelledby") == "prefix_seasons_select":
+            corr_season = s.text == season
+        elif s.get_attribute("aria-labelledby") == "prefix_rounds_select":
+            corr_round = s.text == round
+    return corr_round & corr_season
+
+
+def game_center_title(driver: WebDriver, delay: float = 10) -> str:
+    """Loads the game center and returns the title of the first game group
+    of the default round, load_round waits until it got replaced"""
+    driver.get(GAME_CENTER_URL)
+    wait = WebDriverWait(driver, delay, poll_frequency=0.1)
+    return wait.until(
+        lambda x: x.find_element(By.CLASS_NAME, GROUP_TITLE_CLASS)
+    ).text
+
+
+def load_round(
+        driver: WebDriver,
+        season: str,
+        round: int,
+        default_title: str,
+        delay: float = 10
+) -> list[str]:
+    """Renders the game center page of a round and returns all its links
+
+    Args:
+        driver (WebDriver): driver with accepted cookies
+        season (str): starting year of the season
+        round (int): round to load
+        default_title (str): output of game_center_title for the driver
+        delay (float): seconds to wait for the page
+
+    Returns:
+        list[str]: hrefs of all links on the page
+    """
+    season_name = f"{season}-{int(season[-2:]) + 1}"
+    wait = WebDriverWait(driver, delay, poll_frequency=0.1)
+    start = time.perf_counter()
+    driver.get(f"{GAME_CENTER_URL}?round={round}&season=E{season}")
+    # Wait until the selects show the requested round and the games of the
+    # default round got replaced, the latter never happens if the requested
+    # round is the default one
+    wait.until(lambda x: assert_round(x, season_name, f"Round {round}"))
+    try:
+        wait.until(
+            lambda x: x.find_element(By.CLASS_NAME, GROUP_TITLE_CLASS).text
+            != default_title
+        )
+    except TimeoutException:
+        METRICS.inc("browser_timeouts_total")
+    METRICS.observe("browser_round_seconds", time.perf_counter() - start)
+
+    body = driver.find_element(By.TAG_NAME, "body")
+    soup = bs(body.get_attribute("innerHTML"), "html.parser")
+    return [link.get("href") for link in soup.find_all("a")]
+
+
+def game_links(links: list[str]) -> list[str]:
+    """Unique game links in order of appearance"""
+    return list(dict.fromkeys(
+        link for link in links if link and re_link.match(link)
+    ))
+
+
+def load_with_selenium(season: str, driver: WebDriver) -> list[str]:
+    """Collects the game links of a season by rendering the game center
+    page of every round in the browser
+
+    Args:
+        season (str): starting year of the season
+        driver (WebDriver): driver with accepted cookies, see browser()
+
+    Returns:
+        list[str]: unique game links of the season
+    """
+    default_title = game_center_title(driver)
+    links = []
+    for round in tqdm.tqdm(ROUNDS):
+        links.extend(load_round(driver, season, round, default_title))
+    return game_links(links)
+
+
+def browser_memory_mb(driver: WebDriver) -> float | None:
+    """Resident memory of the driver and all browser processes it started,
+    None if it can't be measured (psutil missing or the process is gone)"""
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process, *process.children(recursive=True)]
+        return sum(p.memory_info().rss for p in processes) / 1024 ** 2
+    except (AttributeError, psutil.Error):
+        return None
+
+
+class BrowserWorker:
+    """A browser of a BrowserPool with accepted cookies
+
+    Attributes:
+        driver: the running browser
+        tasks: tasks run since the browser started
+        context: values tasks keep per browser, e.g. the default round
+            title of the game center, emptied when the browser restarts
+    """
+
+    def __init__(self, driver: WebDriver):
+        self.driver = driver
+        self.tasks = 0
+        self.context: dict[str, Any] = {}
+
+
+class BrowserPool:
+    """Bounded pool of browsers for rendering pages in parallel
+
+    Every pool thread owns one browser that is started on its first task,
+    accepts the cookies once and then serves task after task with the same
+    page. A browser is restarted when a task fails with a WebDriverException
+    (the task is retried on the fresh browser), after max_tasks tasks and
+    when the browser processes use more than max_memory_mb, the latter
+    needs psutil. A TimeoutException only fails the task, a page that
+    didn't render in time says nothing about the browser. The pool can be
+    shared by several seasons.
+
+        with BrowserPool(4) as pool:
+            links = load_with_pool("2023", pool)
+
+    Args:
+        size (int): number of browsers
+        headless (bool): run Chrome without a window
+        max_tasks (int, optional): tasks before a browser is recycled
+        max_memory_mb (float, optional): memory cap of a browser
+        retries (int): restarts and retries of a failed task
+    """
+
+    def __init__(
+            self,
+            size: int = 4,
+            headless: bool = True,
+            max_tasks: int | None = 50,
+            max_memory_mb: float | None = 1024,
+            retries: int = 1
+    ):
+        self.size = size
+        self.headless = headless
+        self.max_tasks = max_tasks
+        self.max_memory_mb = max_memory_mb
+        self.retries = retries
+        self._executor = ThreadPoolExecutor(
+            size, thread_name_prefix="browser"
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._workers: list[BrowserWorker] = []
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(self, task: Callable[..., Any], *args) -> Future:
+        """Runs task(worker, *args) on the next free browser
+
+        Returns:
+            Future: result of the task
+        """
+        return self._executor.submit(self._run, task, args)
+
+    def _start(self) -> BrowserWorker:
+        # Raised as RuntimeError, a TimeoutException of the cookie banner
+        # would look like a round that timed out to the tasks
+        try:
+            driver = create_driver(self.headless)
+        except WebDriverException as e:
+            raise RuntimeError(f"Browser failed to start: {e}") from e
+        try:
+            accept_cookies(driver)
+        except WebDriverException as e:
+            driver.quit()
+            raise RuntimeError(
+                f"Browser failed to accept the cookies: {e}"
+            ) from e
+        except BaseException:
+            driver.quit()
+            raise
+        worker = BrowserWorker(driver)
+        with self._lock:
+            self._workers.append(worker)
+        METRICS.inc("browser_starts_total")
+        return worker
+
+    def _stop(self, worker: BrowserWorker) -> None:
+        with self._lock:
+            self._workers.remove(worker)
+        try:
+            worker.driver.quit()
+        except WebDriverException:
+            pass  # the browser crashed already
+
+    def _run(self, task: Callable[..., Any], args: tuple) -> Any:
+        for attempt in range(self.retries + 1):
+            worker = getattr(self._local, "worker", None)
+            if worker is None:
+                worker = self._local.worker = self._start()
+            try:
+                result = task(worker, *args)
+            except TimeoutException:
+                # Subclass of WebDriverException, the browser is fine
+                METRICS.inc("browser_task_timeouts_total")
+                worker.tasks += 1
+                self._recycle(worker)
+                raise
+            except WebDriverException:
+                self._local.worker = None
+                self._stop(worker)
+                METRICS.inc("browser_restarts_total", reason="error")
+                if attempt == self.retries:
+                    raise
+                continue
+            worker.tasks += 1
+            self._recycle(worker)
+            return result
+
+    def _recycle(self, worker: BrowserWorker) -> None:
+        reason = None
+        if self.max_tasks is not None and worker.tasks >= self.max_tasks:
+            reason = "tasks"
+        elif self.max_memory_mb is not None:
+            memory = browser_memory_mb(worker.driver)
+            if memory is not None and memory > self.max_memory_mb:
+                reason = "memory"
+        if reason is not None:
+            self._local.worker = None
+            self._stop(worker)
+            METRICS.inc("browser_restarts_total", reason=reason)
+
+    def close(self) -> None:
+        """Waits for the submitted tasks and quits all browsers"""
+        self._executor.shutdown(wait=True)
+        for worker in list(self._workers):
+            self._stop(worker)
+
+
+def _pool_round(worker: BrowserWorker, season: str, round: int) -> list[str]:
+    if "default_title" not in worker.context:
+        worker.context["default_title"] = game_center_title(worker.driver)
+    return load_round(
+        worker.driver, season, round, worker.context["default_title"]
+    )
+
+
+def load_with_pool(
+        season: str, pool: BrowserPool, rounds: range = ROUNDS
+) -> list[str]:
+    """load_with_selenium with the rounds spread over the browsers of a
+    pool, the links keep the order of the rounds. Like discover_rounds,
+    rounds whose page timed out are skipped.
+
+    Args:
+        season (str): starting year of the season
+        pool (BrowserPool): pool to render the pages with
+        rounds (range): rounds to load
+
+    Raises:
+        RuntimeError: if no round could be loaded or a browser failed to
+            start
+
+    Returns:
+        list[str]: unique game links of the season
+    """
+    futures = [pool.submit(_pool_round, season, round) for round in rounds]
+    for _ in tqdm.tqdm(as_completed(futures), total=len(futures)):
+        pass
+    links = []
+    failed = 0
+    for round, future in zip(rounds, futures):
+        try:
+            links.extend(future.result())
+        except TimeoutException:
+            print(f"Failed to load round {round} of season {season}")
+            failed += 1
+    if futures and failed == len(futures):
+        raise RuntimeError(f"No round of season {season} could be loaded")
+    return game_links(links)
@@ -0,0 +1,187 @@
+
+from dataclasses import dataclass
+from os import path
+import threading
+import sqlite3
+import hashlib
+import time
+import zlib
+import os
+
+DEFAULT_PATH = path.join(".", "data", "interim", "http_cache.sqlite")
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    immutable: bool
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.immutable or time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Headers to revalidate the entry with the server"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Local HTTP response cache in a single SQLite file
+
+    Entries are keyed by the sha256 of the url and stored zlib compressed.
+    Immutable entries (e.g. finished games) never expire, all others are
+    served for ttl seconds and revalidated with ETag/Last-Modified after.
+    If the stored bodies grow larger than max_bytes, the least recently used
+    entries get evicted.
+
+    Args:
+        db_path (str): location of the SQLite file
+        ttl (float): seconds a mutable entry is served without revalidation
+        max_bytes (int): maximum size of all compressed bodies together
+    """
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_PATH,
+        ttl: float = 6 * 60 * 60,
+        max_bytes: int = 2 * 1024 ** 3
+    ):
+        if db_path != ":memory:":
+            os.makedirs(path.dirname(path.abspath(db_path)), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                immutable INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru "
+            "ON responses (accessed_at)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def get(self, url: str) -> CacheEntry | None:
+        """Returns the stored entry for url or None, marks it as used"""
+        key = self.key(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, body, etag, last_modified, fetched_at, immutable "
+                "FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            self._conn.commit()
+        url, body, etag, last_modified, fetched_at, immutable = row
+        return CacheEntry(
+            url, zlib.decompress(body), etag, last_modified, fetched_at,
+            bool(immutable)
+        )
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        immutable: bool = False
+    ) -> None:
+        """Stores body for url, evicts old entries if the cache is full"""
+        key = self.key(url)
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, url, compressed, len(compressed), etag,
+                    last_modified, now, now, int(immutable)
+                )
+            )
+            self._size += len(compressed) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Marks the entry for url as revalidated (after a 304 answer)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? "
+                "WHERE key = ?",
+                (now, now, self.key(url))
+            )
+            self._conn.commit()
+
+    def delete(self, url: str) -> None:
+        """Drops the entry for url, e.g. a page that turned out broken"""
+        key = self.key(url)
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if old is None:
+                return
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= old[0]
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
@@ -0,0 +1,184 @@
+
+from typing import Iterator
+from features import PLAYER_AVERAGED_STATS, TEAM_STATS_COLUMNS
+from os import path
+import numpy as np
+import polars as pl
+import store
+import json
+import os
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional, only arrow_batches needs it
+    pa = None
+
+BATCH_SIZE = 64 * 1024
+MEMMAP_DIR = path.join(".", "data", "processed", "training")
+
+# Running averages of the player include the game of the row, they get
+# shifted by a game so a row only knows the games before it
+LAGGED_COLUMNS = ["game_number", *PLAYER_AVERAGED_STATS.values()]
+FEATURE_PREFIXES = ("avg_", "last", "ewm")
+
+
+def feature_columns(schema: pl.Schema) -> list[str]:
+    """Model inputs of the features dataset: player and team running
+    averages, form features and the advanced stats of both teams"""
+    team_stats = set(TEAM_STATS_COLUMNS[1:])
+    team_stats |= {f"{column}_opponent" for column in team_stats}
+    return [
+        name for name in schema
+        if name.startswith(FEATURE_PREFIXES) or name in team_stats
+        or name == "game_number"
+    ]
+
+
+def stored_seasons(base_dir: str = store.DATASET_DIR) -> list[str]:
+    seasons = (
+        store.scan("features", base_dir)
+        .select(pl.col("season").unique().sort())
+        .collect()
+    )
+    return [str(season) for season in seasons["season"]]
+
+
+def training_frames(
+        seasons: list[str] | None = None,
+        target: str = "Points",
+        features: list[str] | None = None,
+        base_dir: str = store.DATASET_DIR
+) -> Iterator[tuple[pl.DataFrame, pl.Series]]:
+    """Feature matrix and target of every season, one season at a time so
+    only a single season is in memory
+
+    Args:
+        seasons (list[str], optional): seasons to export, all by default
+        target (str): column to predict
+        features (list[str], optional): input columns, feature_columns of
+            the dataset by default
+        base_dir (str): root directory of the dataset
+
+    Yields:
+        tuple[pl.DataFrame, pl.Series]: Float32 features and target, rows
+        without a target are left out
+    """
+    scan = store.scan("features", base_dir)
+    if features is None:
+        features = feature_columns(scan.collect_schema())
+    if seasons is None:
+        seasons = stored_seasons(base_dir)
+    lagged = [column for column in LAGGED_COLUMNS if column in features]
+
+    for season in seasons:
+        frame = (
+            scan
+            .filter(pl.col("season") == int(season))
+            .sort("Date")
+            .with_columns(
+                pl.col(lagged).shift(1).over("Player")
+            )
+            .filter(pl.col(target).is_not_null())
+            .select(
+                pl.col(features).cast(pl.Float32),
+                pl.col(target).cast(pl.Float32),
+            )
+            .collect()
+        )
+        yield frame.select(features), frame[target]
+
+
+def training_batches(
+        seasons: list[str] | None = None,
+        target: str = "Points",
+        features: list[str] | None = None,
+        batch_size: int = BATCH_SIZE,
+        base_dir: str = store.DATASET_DIR
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Contiguous float32 batches for training, nulls become NaN
+
+    Batches don't span seasons, the last batch of a season can be smaller.
+    See training_frames for the arguments.
+
+    Yields:
+        tuple[np.ndarray, np.ndarray]: (rows, features) matrix and target
+    """
+    for frame, y in training_frames(seasons, target, features, base_dir):
+        for offset in range(0, len(frame), batch_size):
+            yield (
+                frame.slice(offset, batch_size).to_numpy(order="c"),
+                y.slice(offset, batch_size).to_numpy(),
+            )
+
+
+def arrow_batches(
+        seasons: list[str] | None = None,
+        target: str = "Points",
+        features: list[str] | None = None,
+        batch_size: int = BATCH_SIZE,
+        base_dir: str = store.DATASET_DIR
+) -> Iterator["pa.RecordBatch"]:
+    """Same as training_batches as Arrow record batches with the target
+    as last column, the buffers are shared with polars instead of copied"""
+    if pa is None:
+        raise ImportError("arrow_batches needs pyarrow")
+    for frame, y in training_frames(seasons, target, features, base_dir):
+        yield from frame.with_columns(y).to_arrow().to_batches(batch_size)
+
+
+def write_memmap(
+        directory: str = MEMMAP_DIR,
+        seasons: list[str] | None = None,
+        target: str = "Points",
+        features: list[str] | None = None,
+        base_dir: str = store.DATASET_DIR
+) -> dict:
+    """Writes features and target as raw float32 files that read_memmap
+    maps into memory, so all seasons can be trained on without loading
+    them. Seasons are appended one after the other.
+
+    Returns:
+        dict: the metadata, rows, columns and target
+    """
+    os.makedirs(directory, exist_ok=True)
+    x_path = path.join(directory, "x.f32")
+    y_path = path.join(directory, "y.f32")
+    rows = 0
+    columns = features
+    with open(x_path + ".tmp", "wb") as x_file, \
+            open(y_path + ".tmp", "wb") as y_file:
+        for frame, y in training_frames(seasons, target, features, base_dir):
+            columns = frame.columns
+            x_file.write(frame.to_numpy(order="c").tobytes())
+            y_file.write(y.to_numpy().tobytes())
+            rows += len(frame)
+    os.replace(x_path + ".tmp", x_path)
+    os.replace(y_path + ".tmp", y_path)
+
+    meta = {"rows": rows, "columns": columns, "target": target}
+    with open(path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def read_memmap(
+        directory: str = MEMMAP_DIR
+) -> tuple[np.memmap, np.memmap, list[str]]:
+    """Maps a training matrix written by write_memmap read only
+
+    Returns:
+        tuple[np.memmap, np.memmap, list[str]]: features, target and the
+        feature names
+    """
+    with open(path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    rows, columns = meta["rows"], meta["columns"] or []
+    x = np.memmap(
+        path.join(directory, "x.f32"), dtype=np.float32, mode="r",
+        shape=(rows, len(columns))
+    )
+    y = np.memmap(
+        path.join(directory, "y.f32"), dtype=np.float32, mode="r",
+        shape=(rows,)
+    )
+    return x, y, columns
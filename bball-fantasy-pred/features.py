@@ -0,0 +1,381 @@
+
+import polars as pl
+
+# Box score columns that get a running average, adding a stat here adds it
+# to the player and team features
+AVERAGED_COLUMNS = [
+    "Points",
+    "TwoPMakes", "TwoPAttempts", "2P_Percentage",
+    "ThreePMakes", "ThreePAttempts", "3P_Percentage",
+    "FTMakes", "FTAttempts", "FTP_Percentage",
+    "O_Rebounds", "D_Rebounds", "Total_Rebounds",
+    "Assists", "Steals", "Turnovers",
+    "Blocks", "ReceivedBlocks",
+    "FoulsCommited", "FoulReceived",
+    "Effectivity", "PlusMinus",
+]
+# Feature names that don't follow avg_<column>
+AVERAGE_NAMES = {"Points": "avg_points", "Seconds": "avg_seconds"}
+
+
+def average_name(stat: str) -> str:
+    return AVERAGE_NAMES.get(stat, f"avg_{stat}")
+
+
+# Stats that get a running average, column in the box score -> feature name
+AVERAGED_STATS = {stat: average_name(stat) for stat in AVERAGED_COLUMNS}
+PLAYER_AVERAGED_STATS = {
+    stat: average_name(stat) for stat in ["Seconds", *AVERAGED_COLUMNS]
+}
+
+# Last-N windows of the rolling form features and spans of their EWMA
+FORM_WINDOWS = [5]
+FORM_SPANS = [5]
+PLAYER_FORM_STATS = ["Seconds", *AVERAGED_COLUMNS]
+TEAM_FORM_STATS = AVERAGED_COLUMNS
+
+TEAM_STATS_COLUMNS = [
+    "TEAM", "PACE", "POSS", "OFF RTG",	"DEF RTG",	"NET RTG", "OR%",
+    "DR%", "TR%", "AST%", "AST Ratio", "AST/TO", "TO Ratio", "ST%",
+    "PF 100 Poss", "DF 100 Poss", "BLK%"
+]
+
+
+def season_name(season: str) -> str:
+    season_num = int(season)
+    return f"{season_num-2000}_{season_num-1999}"
+
+
+def prepare_box_scores(all_stats: pl.DataFrame) -> pl.DataFrame:
+    """Sorts the box scores by date, the running averages depend on it
+
+    The columns are already typed by the parser, see
+    parsing.BOX_SCORE_SCHEMA. All feature functions below work on
+    DataFrames and LazyFrames alike, build_features chains them into one
+    lazy plan.
+    """
+    return all_stats.sort("Date")
+
+
+def running_averages(
+        stats: pl.LazyFrame,
+        over: str,
+        averaged: dict[str, str],
+        state: pl.LazyFrame | None = None
+) -> pl.LazyFrame:
+    """Adds game_number and the season to date average of every stat in
+    averaged, stats has to be sorted by date
+
+    Args:
+        stats (pl.LazyFrame): prepared box score rows
+        over (str): column to group by, Player or Team
+        averaged (dict[str, str]): stat column -> average column
+        state (pl.LazyFrame, optional): running_state of the games before
+            stats, the averages continue from there instead of from zero
+
+    Returns:
+        pl.LazyFrame: stats with game_number and the average columns
+    """
+    game_number = pl.col("Player").cum_count().over(over)
+    sums = {
+        stat: pl.col(stat).cum_sum().over(over) for stat in averaged
+    }
+    if state is not None:
+        # The running sums below need the date order of stats
+        stats = stats.join(
+            state.rename({"game_number": "prev_game_number"}),
+            on=over,
+            how="left",
+            maintain_order="left"
+        )
+        game_number = (
+            game_number + pl.col("prev_game_number").fill_null(0)
+        ).cast(pl.UInt32)
+        sums = {
+            stat: expr + pl.col(f"sum_{stat}").fill_null(0)
+            for stat, expr in sums.items()
+        }
+    stats = (
+        stats
+        .with_columns(game_number=game_number)
+        .with_columns(**{
+            name: sums[stat].truediv("game_number")
+            for stat, name in averaged.items()
+        })
+    )
+    if state is not None:
+        stats = stats.drop(
+            ["prev_game_number", *[f"sum_{stat}" for stat in averaged]]
+        )
+    return stats
+
+
+def running_state(
+        stats: pl.LazyFrame,
+        over: str,
+        averaged: dict[str, str],
+        state: pl.LazyFrame | None = None
+) -> pl.LazyFrame:
+    """Game count and stat sums per group, everything running_averages
+    needs to continue the averages with later games
+
+    Args:
+        stats (pl.LazyFrame): prepared box score rows
+        over (str): column to group by, Player or Team
+        averaged (dict[str, str]): stat column -> average column
+        state (pl.LazyFrame, optional): state of earlier games to add to
+
+    Returns:
+        pl.LazyFrame: one row per group with game_number and sum_<stat>
+    """
+    new_state = stats.group_by(over).agg(
+        pl.len().alias("game_number"),
+        *[pl.col(stat).sum().alias(f"sum_{stat}") for stat in averaged]
+    )
+    if state is None:
+        return new_state
+    return (
+        pl.concat([state, new_state])
+        .group_by(over)
+        .agg(pl.all().sum())
+    )
+
+
+def _ewm_state_name(span: int, stat: str) -> str:
+    return f"ewm_state{span}_{stat}"
+
+
+def form_names(
+        stats: list[str],
+        windows: list[int] = FORM_WINDOWS,
+        spans: list[int] = FORM_SPANS
+) -> list[str]:
+    """Names of the columns form_features adds"""
+    names = []
+    for stat in stats:
+        for n in windows:
+            names += [f"last{n}_{stat}", f"last{n}_std_{stat}"]
+        names += [f"ewm{span}_{stat}" for span in spans]
+    return names
+
+
+def form_features(
+        stats: pl.LazyFrame,
+        over: str,
+        columns: list[str],
+        windows: list[int] = FORM_WINDOWS,
+        spans: list[int] = FORM_SPANS,
+        tail: pl.LazyFrame | None = None
+) -> tuple[pl.LazyFrame, pl.LazyFrame]:
+    """Adds mean and standard deviation of the last N games and an
+    exponentially weighted mean of every stat in columns, per group and in
+    one pass over stats, which has to be sorted by date
+
+    All of them only see the games before the row, never the row itself.
+    The EWMA runs with adjust=False, so it continues from its last value:
+    the tail of the previous call holds the last games of every group and
+    that value, with it new games get the same features as if the whole
+    history was processed again.
+
+    Args:
+        stats (pl.LazyFrame): box score rows
+        over (str): column to group by, Player or Team
+        columns (list[str]): stats that get form features
+        windows (list[int]): sizes of the last-N windows
+        spans (list[int]): spans of the EWMA
+        tail (pl.LazyFrame, optional): tail returned for the earlier games
+
+    Returns:
+        tuple[pl.LazyFrame, pl.LazyFrame]: stats with the form_names
+        columns, and the tail to continue from
+    """
+    if tail is None:
+        stats = stats.with_columns(_tail=pl.lit(False))
+        seed = pl.lit(False)
+    else:
+        stats = pl.concat(
+            [
+                tail.with_columns(_tail=pl.lit(True)),
+                stats.with_columns(_tail=pl.lit(False)),
+            ],
+            how="diagonal_relaxed"
+        )
+        # The last tail row of a group carries the EWMA of all games before
+        seed = (
+            pl.col("_tail")
+            & ~pl.col("_tail").shift(-1).over(over).fill_null(False)
+        )
+
+    states = {}
+    for stat in columns:
+        for span in spans:
+            state = _ewm_state_name(span, stat)
+            value = pl.col(stat).cast(pl.Float64)
+            if tail is not None:
+                value = (
+                    pl.when(seed).then(pl.col(state))
+                    .when(pl.col("_tail")).then(None)
+                    .otherwise(value)
+                )
+            states[state] = (
+                value.ewm_mean(span=span, adjust=False, ignore_nulls=True)
+                .forward_fill()
+                .over(over)
+            )
+    stats = stats.with_columns(**states)
+
+    form = {}
+    for stat in columns:
+        previous = pl.col(stat).shift(1)
+        for n in windows:
+            form[f"last{n}_{stat}"] = (
+                previous.rolling_mean(n, min_samples=1).over(over)
+            )
+            form[f"last{n}_std_{stat}"] = (
+                previous.rolling_std(n, min_samples=2).over(over)
+            )
+        for span in spans:
+            form[f"ewm{span}_{stat}"] = (
+                pl.col(_ewm_state_name(span, stat)).shift(1).over(over)
+            )
+
+    features = (
+        stats
+        .with_columns(**form)
+        .filter(~pl.col("_tail"))
+        .drop("_tail", *states)
+    )
+    new_tail = (
+        stats
+        .group_by(over, maintain_order=True)
+        .tail(max([*windows, 1]))
+        .select(over, "Date", *columns, *states)
+    )
+    return features, new_tail
+
+
+def merge_team_form(
+        player_rows: pl.LazyFrame,
+        team_form: pl.LazyFrame,
+        names: list[str]
+) -> pl.LazyFrame:
+    """Adds the form features of the own team and the opponent in the game
+    of every player row. They are lag safe already, so the join is on the
+    game itself."""
+    team_form = team_form.select("Team", "Date", *names)
+    return (
+        player_rows
+        .join(
+            team_form.rename({name: f"{name}_own_team" for name in names}),
+            on=["Team", "Date"],
+            how="left"
+        )
+        .join(
+            team_form.rename({name: f"{name}_opponent" for name in names}),
+            left_on=["Opponent", "Date"],
+            right_on=["Team", "Date"],
+            how="left"
+        )
+    )
+
+
+def team_averages(
+        prepared: pl.LazyFrame, state: pl.LazyFrame | None = None
+) -> pl.LazyFrame:
+    """Running averages of the team totals, one row per team and game"""
+    return (
+        running_averages(
+            prepared.filter(pl.col("Player").eq("Total")),
+            "Team", AVERAGED_STATS, state
+        )
+        .select(
+            *AVERAGED_STATS.values(),
+            "game_number", "Team", "Player", "Round", "Date"
+        )
+    )
+
+
+def player_averages(
+        prepared: pl.LazyFrame, state: pl.LazyFrame | None = None
+) -> pl.LazyFrame:
+    """Box score rows of the players with their running averages"""
+    return running_averages(
+        prepared.filter(pl.col("Player").ne("Total")),
+        "Player", PLAYER_AVERAGED_STATS, state
+    )
+
+
+def merge_team_averages(
+        stats_with_running_averages: pl.LazyFrame,
+        team_totals: pl.LazyFrame
+) -> pl.LazyFrame:
+    """Adds the latest own team and opponent averages from strictly before
+    the game to every player row
+
+    The lookup is an as-of join on Date by team, so a postponed game still
+    gets the state right before it and a game never sees its own totals.
+    Rows of a team's first game have no team averages (null). Both sides
+    are sorted by Date, the sortedness check can't see that with by groups.
+    """
+    team_state = (
+        team_totals
+        .select("Team", "Date", *AVERAGED_STATS.values())
+        .sort("Date")
+    )
+
+    def suffixed(suffix: str) -> pl.LazyFrame:
+        return team_state.rename({
+            name: f"{name}{suffix}" for name in AVERAGED_STATS.values()
+        })
+
+    return (
+        stats_with_running_averages
+        .sort("Date")
+        .join_asof(
+            suffixed("_own_team"),
+            on="Date",
+            by="Team",
+            strategy="backward",
+            allow_exact_matches=False,
+            check_sortedness=False
+        )
+        .join_asof(
+            suffixed("_opponent"),
+            on="Date",
+            by_left="Opponent",
+            by_right="Team",
+            strategy="backward",
+            allow_exact_matches=False,
+            check_sortedness=False
+        )
+    )
+
+
+def add_team_stats(
+        merged_stats: pl.LazyFrame,
+        prepared_team_stats: pl.LazyFrame,
+        season: str
+) -> pl.LazyFrame:
+    """Adds the advanced stats of both teams and the season name"""
+    # Team names of the box scores are categorical
+    prepared_team_stats = prepared_team_stats.with_columns(
+        pl.col("TEAM").cast(pl.Categorical)
+    )
+    return (
+        merged_stats
+        .join(
+            prepared_team_stats,
+            left_on="Team",
+            right_on="TEAM",
+            suffix="_own_team"
+        )
+        .join(
+            prepared_team_stats,
+            left_on="Opponent",
+            right_on="TEAM",
+            suffix="_opponent"
+        )
+        .with_columns(
+            Season=pl.lit(season_name(season))
+        )
+    )
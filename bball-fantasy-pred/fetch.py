@@ -0,0 +1,265 @@
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable, Iterator
+from cache import ResponseCache
+from metrics import METRICS, Metrics
+import threading
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://www.euroleaguebasketball.net"
+
+# Status codes worth another try, everything else is returned or raised
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread safe token bucket, every request takes one token
+
+    Args:
+        rate (float): tokens added per second
+        capacity (float): maximum amount of tokens, allows short bursts
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate has to be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a token is available and takes it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                refill = (now - self._last) * self.rate
+                self._tokens = min(self.capacity, self._tokens + refill)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Fetcher:
+    """Fetches pages from the euroleague site with a pool of threads
+
+    All threads share one keep-alive connection pool and one token bucket, so
+    the throughput is bound by the rate limit and not by the round trip time.
+    The threads belong to the fetcher, concurrent fetch_all calls (e.g. of
+    several seasons) together make at most max_workers requests at once.
+
+    Args:
+        base_url (str): url that gets prepended to every link
+        max_workers (int): maximum amount of concurrent requests
+        rate (float): maximum requests per second, includes retries
+        burst (float): amount of requests allowed at once before limiting
+        max_retries (int): retries on connection errors and 429/5xx answers
+        backoff (float): base delay in seconds, doubled every retry
+        timeout (float): timeout for a single request in seconds
+        limiter (TokenBucket, optional): shared limiter, overrides rate/burst
+        cache (ResponseCache, optional): cache to serve and store pages
+        is_final (Callable[[bytes], bool], optional): decides if a page
+            never changes anymore, final pages are cached without expiry
+        metrics (Metrics, optional): where requests, latencies, bytes and
+            cache lookups are counted, the shared METRICS by default
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        max_workers: int = 4,
+        rate: float = 1.0,
+        burst: float = 1.0,
+        max_retries: int = 4,
+        backoff: float = 1.0,
+        timeout: float = 30.0,
+        limiter: TokenBucket | None = None,
+        cache: ResponseCache | None = None,
+        is_final: Callable[[bytes], bool] | None = None,
+        metrics: Metrics | None = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = limiter or TokenBucket(rate, burst)
+        self.cache = cache
+        self.is_final = is_final
+        self.metrics = metrics or METRICS
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="fetch"
+        )
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_workers, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def url(self, link: str) -> str:
+        if link.startswith("http://") or link.startswith("https://"):
+            return link
+        return f"{self.base_url}{link}"
+
+    def _sleep_backoff(self, attempt: int, response=None) -> None:
+        self.metrics.inc("http_retries_total")
+        delay = None
+        if response is not None:
+            delay = _retry_after(response)
+        if delay is None:
+            delay = self.backoff * 2 ** attempt
+            delay += random.uniform(0, delay / 2)
+        time.sleep(delay)
+
+    def request(self, link: str, headers: dict | None = None
+                ) -> requests.Response:
+        """Requests a single page, retries with exponential backoff
+
+        Args:
+            link (str): link relative to base_url or full url
+            headers (dict, optional): additional request headers
+
+        Raises:
+            requests.HTTPError: if the last try still failed
+
+        Returns:
+            requests.Response: response of the last try
+        """
+        url = self.url(link)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.get(
+                    url, headers=headers, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                self.metrics.inc("http_requests_total", status="error")
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_backoff(attempt)
+                continue
+            self.metrics.observe(
+                "http_request_seconds", time.perf_counter() - start
+            )
+            self.metrics.inc(
+                "http_requests_total", status=response.status_code
+            )
+            self.metrics.inc("http_bytes_total", len(response.content))
+            if response.status_code not in RETRY_STATUS:
+                break
+            if attempt < self.max_retries:
+                self._sleep_backoff(attempt, response)
+        response.raise_for_status()
+        return response
+
+    def get(self, link: str) -> bytes:
+        """Returns the raw content of the page under link
+
+        With a cache, fresh entries are returned without network I/O and
+        stale ones are revalidated with a conditional request.
+        """
+        if self.cache is None:
+            return self.request(link).content
+
+        url = self.url(link)
+        entry = self.cache.get(url)
+        if entry is not None and entry.is_fresh(self.cache.ttl):
+            self.metrics.inc("cache_lookups_total", result="hit")
+            return entry.body
+
+        headers = entry.conditional_headers() if entry is not None else None
+        response = self.request(link, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.metrics.inc("cache_lookups_total", result="revalidated")
+            self.cache.touch(url)
+            return entry.body
+        self.metrics.inc("cache_lookups_total", result="miss")
+
+        content = response.content
+        self.cache.put(
+            url,
+            content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            immutable=self.is_final is not None and self.is_final(content)
+        )
+        return content
+
+    def forget(self, link: str) -> None:
+        """Drops the cached page of link, the next get fetches it again"""
+        if self.cache is not None:
+            self.cache.delete(self.url(link))
+
+    def fetch_all(
+        self, links: Iterable[str]
+    ) -> Iterator[tuple[str, bytes | None]]:
+        """Fetches all links concurrently, yields them in the order of links
+
+        At most twice max_workers pages of a call are in flight or waiting
+        to be consumed, so memory stays bounded for long link lists. Links
+        that still fail after all retries are yielded with None as content.
+
+        Args:
+            links (Iterable[str]): links to fetch
+
+        Yields:
+            tuple[str, bytes | None]: link and the page content
+        """
+        links = iter(links)
+        pending: deque[tuple[str, Future]] = deque()
+        window = self.max_workers * 2
+        try:
+            for link in links:
+                pending.append((link, self._executor.submit(self.get, link)))
+                if len(pending) >= window:
+                    yield self._result(*pending.popleft())
+            while pending:
+                yield self._result(*pending.popleft())
+        finally:
+            # A consumer that stops early leaves no requests queued
+            for _, future in pending:
+                future.cancel()
+
+    def _result(
+        self, link: str, future: Future
+    ) -> tuple[str, bytes | None]:
+        try:
+            return link, future.result()
+        except requests.RequestException as e:
+            print(f"Failed to fetch {link}: {e}")
+            self.metrics.inc("fetch_failures_total")
+            return link, None
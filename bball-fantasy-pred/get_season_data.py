@@ -1,579 +1,578 @@
 
-from bs4 import BeautifulSoup as bs
-from os import path
+from cache import ResponseCache
+from fetch import Fetcher
+from schedule import ROUNDS, discover_rounds
+from parsing import (
+    DEFAULT_ENGINE, ENGINES, CellBuffer, box_score_cells, game_info_items,
+    parse_page
+)
+from pipeline import parse_pages, parser_pool
+from metrics import METRICS, REPORT_PATH
+from incremental import Checkpoints, SeasonState, game_code
+from validation import InvalidGame, Quarantine, validate_game
+import store
+from features import (
+    AVERAGED_STATS, PLAYER_AVERAGED_STATS, PLAYER_FORM_STATS,
+    TEAM_FORM_STATS, add_team_stats, form_features, form_names,
+    merge_team_averages, merge_team_form, player_averages,
+    prepare_box_scores, running_state, team_averages
+)
+from team_stats import load_team_stats
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from typing import TYPE_CHECKING
 import polars as pl
 import pendulum
-import platform
-import requests
 import tqdm
-import time
+import argparse
+import json
 import sys
-import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.by import By
-
-driver = None
-
-if platform.system() == "Windows":
-    from webdriver_manager.firefox import GeckoDriverManager
-    driver = webdriver.Firefox(service=Service(GeckoDriverManager().install()))
-if platform.system() == "Linux":
-    from webdriver_manager.chrome import ChromeDriverManager
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()),
-        options=options
-    )
+import uuid
 
+if TYPE_CHECKING:
+    from browser import BrowserPool
 
-def assert_round(driver, season, round):
-    elm = driver.find_elements(
-        By.CLASS_NAME, "game-center-select-shared_selectedValue__4xru_"
-    )
-    corr_season = False
-    corr_round = False
-    for s in elm:
-        if s.get_attribute("aria-labelledby") == "prefix_seasons_select":
-            corr_season = s.text == season
-        elif s.get_attribute("aria-labelledby") == "prefix_rounds_select":
-            corr_round = s.text == round
-    return corr_round & corr_season
-
-
-def load_with_selenium(season: str):
-    links = []
-    # Accept cookies
-    eu_url = "https://www.euroleaguebasketball.net/euroleague/"
-
-    driver.get(eu_url)
-    delay = 10
-    element = (
-        WebDriverWait(driver, delay)
-        .until(lambda x: x.find_element(By.ID, "onetrust-accept-btn-handler"))
-    )
-    element.click()
-
-    driver.get("https://www.euroleaguebasketball.net/euroleague/game-center/")
-    date_element = (
-        WebDriverWait(driver, delay)
-        .until(lambda x: x.find_element(
-                By.CLASS_NAME,
-                "game-center-group_groupTitle__5RCk4"
-            )
-        )
-    )
-    old_date = date_element.text
-    season_name = f"{season}-{int(season[-2:]) + 1}"
-    for round in tqdm.tqdm(range(1, 35)):
-        entry_url = (
-            "https://www.euroleaguebasketball.net/euroleague/game-center/?"
-            f"round={round}&season=E{season}"
-        )
-        driver.get(entry_url)
-        while not assert_round(
-            driver, season_name, f"Round {round}"
-        ):
-            time.sleep(1)
 
-        while not old_date != driver.find_element(
-            By.CLASS_NAME, "game-center-group_groupTitle__5RCk4"
-        ).text:
-            time.sleep(1)
+def is_final_game(content: bytes) -> bool:
+    """Checks if a game page belongs to a finished game, i.e. it has a box
+    score and the game date lies before today. Those pages never change and
+    can be cached forever. Only the game info gets read, the page is
+    parsed completely by the parser pool anyway.
 
-        body = driver.find_element(By.TAG_NAME, "body")
+    Args:
+        content (bytes): raw html of the game page
 
-        body_content = body.get_attribute("innerHTML")
+    Returns:
+        bool: True if the game is finished
+    """
+    if b"tableGroupedColumnStatGroupContainer" not in content:
+        return False
+    info_items = game_info_items(content)
+    if len(info_items) < 2:
+        return False
+    try:
+        date = pendulum.from_format(info_items[1], "D MMM YYYY")
+    except ValueError:
+        return False
+    return date.date() < pendulum.today().date()
+
+
+def get_game_data(
+        link: str, fetcher: Fetcher | None = None
+) -> pl.DataFrame:
+    """Pulls game data for game under specified link from euroleague homepage
 
-        soup = bs(body_content, "html.parser")
+    Args:
+        link (str): euroleague page game link
+        fetcher (Fetcher, optional): Fetcher to use, a new one if not given
 
-        for link in soup.find_all("a"):
-            links.append(link.get("href"))
+    Returns:
+        pl.DataFrame: DataFrame with all relevant Data From Site
+    """
+    if fetcher is None:
+        with Fetcher() as fetcher:
+            return parse_game_data(fetcher.get(link))
+    return parse_game_data(fetcher.get(link))
+
+
+def parse_game_cells(
+        content: bytes, engine: str = DEFAULT_ENGINE
+) -> dict[str, list] | InvalidGame | None:
+    """Parses the content of a game page into long format stat cells, see
+    parsing.box_score_cells. Many games are turned into box scores at once
+    with a parsing.CellBuffer.
+
+    The page is validated on the way, see validation.validate_game. A page
+    that fails, or that makes the parser raise, returns an InvalidGame with
+    the problems and the content instead of cells, so the caller can
+    quarantine it instead of losing the season.
+    """
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Unknown parser engine {engine}, use one of {list(ENGINES)}"
+        )
+    try:
+        game = parse_page(content, engine)
+        problems = validate_game(game)
+        if problems:
+            return InvalidGame(problems, content)
+        return box_score_cells(game)
+    except Exception as e:
+        return InvalidGame([f"{type(e).__name__}: {e}"], content)
 
-    driver.close()
-    link_format = (
-        r"/euroleague/game-center/\d\d\d\d-\d\d/[\w-]+/E\d\d\d\d/[\d]{1,3}/"
-    )
-    r = re.compile(link_format)
-    newlist = list(filter(r.match, links))
 
-    return list(dict.fromkeys(newlist))
+def parse_game_data(
+        content: bytes, engine: str = DEFAULT_ENGINE
+) -> pl.DataFrame | None:
+    """Parses the content of a game page into a boxscore
 
+    Args:
+        content (bytes): raw html of the game page
+        engine (str): parser engine, see parsing.parse_page
 
-def player_column_dicts(
-        player_names: list,
-        box1_columns: list,
-        box2_columns: list,
-        soup: bs
-) -> tuple[dict[str, str], dict[str, str]]:
-    div_class = (
-        "game-box-scores-table-grouped-tab_tableGroupedRowsContainer__rmPnn "
-        "game-box-scores-table-grid-sizing_tableGridSizing__KbFAw"
-    )
-    name_div = soup.find_all("div", attrs={"class": div_class})
-
-    # Get amount of player name divs and divs themselves for home and away
-    home_team_players = name_div[0].find_all("div", recursive=False)[2:]
-    home_team_player_count = len(home_team_players)
-    away_team_players = name_div[1].find_all("div", recursive=False)[2:]
-    away_team_player_count = len(away_team_players)
-
-    # Check if second last item contains Team, if it does there are 2 extra
-    # rows, else only the total so one extra row
-    # this is important for taking the appropriate amount of players
-    # from the list
-    # TODO: Take player names here directly, like why the extra steps
-    if home_team_players[-2].find("b").get_text().strip() == "Team":
-        home_team_player_count -= 2
-        home_team_team = True
-    else:
-        home_team_player_count -= 1
-        home_team_team = False
-    if away_team_players[-2].find("b").get_text().strip() == "Team":
-        away_team_player_count -= 2
-        away_team_team = True
-    else:
-        away_team_player_count -= 1
-        away_team_team = False
-
-    t1_names = player_names[:home_team_player_count]
-    t2_names = player_names[home_team_player_count:]
-
-    t1_renames = {}
-    for i, x in enumerate(t1_names):
-        t1_renames[f"column_{i}"] = x[1]
-    if home_team_team:
-        t1_renames[f"column_{i+1}"] = "Team"
-        t1_renames[f"column_{i+2}"] = "Total"
-    else:
-        t1_renames[f"column_{i+1}"] = "Total"
-
-    t2_renames = {}
-    for j, x in enumerate(t2_names):
-        t2_renames[f"column_{j}"] = x[1]
-    if away_team_team:
-        t2_renames[f"column_{j+1}"] = "Team"
-        t2_renames[f"column_{j+2}"] = "Total"
-    else:
-        t2_renames[f"column_{j+1}"] = "Total"
+    Returns:
+        pl.DataFrame | None: box score in parsing.BOX_SCORE_SCHEMA, None if
+        the page has no box score
 
-    return t1_renames, t2_renames
+    Raises:
+        ValueError: if the page fails validation
+    """
+    cells = parse_game_cells(content, engine)
+    if isinstance(cells, InvalidGame):
+        raise ValueError(f"Invalid game page: {'; '.join(cells.problems)}")
+    if cells is None:
+        return None
+    buffer = CellBuffer()
+    buffer.add("", cells)
+    return buffer.box_scores()
+
+
+def get_box_scores(
+        season: str,
+        fetcher: Fetcher | None = None,
+        use_browser: bool = False,
+        parse_workers: int | None = None,
+        state: SeasonState | None = None,
+        checkpoints: Checkpoints | None = None,
+        parse_pool: Executor | None = None,
+        quarantine: Quarantine | None = None,
+        browser_pool: "BrowserPool | None" = None
+) -> tuple[pl.DataFrame | None, list[str]]:
+    """Pulls the box scores of all games of a season
 
+    Args:
+        season (str): starting year of the season
+        fetcher (Fetcher, optional): Fetcher to use, a cached one if not given
+        use_browser (bool): discover the game links with Selenium
+        parse_workers (int, optional): parser processes, see parse_pages
+        state (SeasonState, optional): state of the already ingested games,
+            only games missing in its manifest get fetched. The game codes
+            found per round get stored in it.
+        checkpoints (Checkpoints, optional): every parsed game is saved
+            there and games already in it are loaded instead of fetched
+        parse_pool (Executor, optional): shared parser pool, see parse_pages
+        quarantine (Quarantine, optional): pages that fail validation are
+            saved there. They are skipped either way and dropped from the
+            response cache, so the next update fetches them again.
+        browser_pool (BrowserPool, optional): shared browsers for
+            use_browser, a pool for this season only if not given
 
-def get_game_info(soup: bs) -> dict:
-    """Takes a game page and returns relevant data like team names, Date and
-    Time and Round
+    Returns:
+        tuple[pl.DataFrame | None, list[str]]: box scores of the fetched
+        games, None if there were none, and their game codes
+    """
+    if state is None:
+        state = SeasonState(season)
+    # Cells of all games get pivoted and cast together at the end
+    cells = CellBuffer()
+    new_games = []
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = Fetcher(cache=ResponseCache(), is_final=is_final_game)
+    try:
+        with METRICS.stage("discover", season=season):
+            if use_browser:
+                # Selenium only gets imported if it is actually used
+                from browser import BrowserPool, load_with_pool
+                if browser_pool is None:
+                    with BrowserPool() as pool:
+                        res = load_with_pool(season, pool)
+                else:
+                    res = load_with_pool(season, browser_pool)
+            else:
+                # Rounds that are fully ingested can't have new games
+                rounds = [
+                    r for r in ROUNDS if r not in state.complete_rounds()
+                ]
+                links_per_round = discover_rounds(season, fetcher, rounds)
+                for round, links in links_per_round.items():
+                    state.rounds[round] = [game_code(link) for link in links]
+                res = list(dict.fromkeys(
+                    link for r in rounds
+                    for link in links_per_round.get(r, [])
+                ))
+        res = state.new_links(res)
+        print(f"{len(res)} new games in season {season}")
+        if checkpoints is not None:
+            with METRICS.stage("checkpoints", season=season):
+                for link in res:
+                    if game_code(link) in checkpoints:
+                        cells.add(
+                            game_code(link),
+                            checkpoints.load(game_code(link))
+                            .to_dict(as_series=False)
+                        )
+                        new_games.append(game_code(link))
+            res = [link for link in res if game_code(link) not in checkpoints]
+            print(f"{len(new_games)} games loaded from checkpoints")
+            METRICS.inc(
+                "games_total", len(new_games),
+                season=season, source="checkpoint"
+            )
+        # Pages stream from the fetcher threads into the parser processes
+        with METRICS.stage("fetch_parse", season=season):
+            parsed = parse_pages(
+                fetcher.fetch_all(res), parse_game_cells,
+                workers=parse_workers, pool=parse_pool
+            )
+            for link, game_cells in tqdm.tqdm(parsed, total=len(res)):
+                if isinstance(game_cells, InvalidGame):
+                    print(
+                        f"{game_code(link)} failed validation: "
+                        f"{'; '.join(game_cells.problems)}"
+                    )
+                    METRICS.inc("games_invalid_total", season=season)
+                    # A finished game would be served from the cache forever
+                    fetcher.forget(link)
+                    if quarantine is not None:
+                        quarantine.save(game_code(link), link, game_cells)
+                elif game_cells is not None:
+                    cells.add(game_code(link), game_cells)
+                    new_games.append(game_code(link))
+                    METRICS.inc("games_total", season=season, source="page")
+                    if checkpoints is not None:
+                        checkpoints.save(
+                            game_code(link), pl.DataFrame(game_cells)
+                        )
+    finally:
+        if own_fetcher:
+            fetcher.close()
+            fetcher.cache.close()
+
+    with METRICS.stage("reshape", season=season):
+        return cells.box_scores(), new_games
+
+
+def build_features(
+        prepared: pl.DataFrame,
+        season: str,
+        state: SeasonState,
+        team_stats: pl.DataFrame | None = None
+) -> pl.DataFrame:
+    """Builds the feature table from prepared box scores, the running
+    averages continue from state which gets updated in place
+
+    Features and new state are one lazy plan that gets collected at once,
+    so the shared parts (filters, window sums) only run a single time.
 
     Args:
-        soup (bs): BeatifoulSoup4 Object with parsed html
+        prepared (pl.DataFrame): output of prepare_box_scores
+        season (str): starting year of the season
+        state (SeasonState): state of the games before the box scores
+        team_stats (pl.DataFrame, optional): advanced team stats of the
+            season, read with load_team_stats if not given
 
     Returns:
-        dict: dict with contents home_team, away_team, round, date, time
+        pl.DataFrame: one row per player and game with all features
     """
-    name_class = "club-info_name__xB4rz"
-    team_names = []
-    for element in soup.find_all("h1", attrs={"class": name_class}):
-        team_names.append(element.get_text().strip())
-
-    game_info_class = "event-info_listItem__Iu4ou"
-    game_info = []
-    for element in soup.find_all("li", attrs={"class": game_info_class}):
-        game_info.append(element.get_text().strip())
-
-    return {
-        "home_team": team_names[0],
-        "away_team": team_names[1],
-        "round": re.search(r"(\d{1,2})", game_info[0])[0],
-        "date": pendulum.from_format(game_info[1], "D MMM YYYY"),
-        "time": game_info[3]
-    }
-
-
-def get_game_data(link: str) -> pl.DataFrame:
-    """Pulls game data for game under specified link from euroleague homepage
+    def lazy(df: pl.DataFrame | None) -> pl.LazyFrame | None:
+        return None if df is None else df.lazy()
+
+    if team_stats is None:
+        team_stats = load_team_stats(season)
+
+    prepared = prepared.lazy()
+    player_rows = prepared.filter(pl.col("Player").ne("Total"))
+    team_rows = prepared.filter(pl.col("Player").eq("Total"))
+
+    team_totals = team_averages(prepared, lazy(state.teams))
+    if state.team_totals is not None:
+        team_totals = pl.concat([state.team_totals.lazy(), team_totals])
+    player_stats, player_form = form_features(
+        player_averages(prepared, lazy(state.players)),
+        "Player", PLAYER_FORM_STATS, tail=lazy(state.player_form)
+    )
+    team_form_stats, team_form = form_features(
+        team_rows, "Team", TEAM_FORM_STATS, tail=lazy(state.team_form)
+    )
+    merged_stats = merge_team_form(
+        merge_team_averages(player_stats, team_totals),
+        team_form_stats, form_names(TEAM_FORM_STATS)
+    )
+    full_stats = add_team_stats(merged_stats, team_stats.lazy(), season)
+
+    with METRICS.stage("features", season=season):
+        (
+            full_stats, state.team_totals, state.player_form,
+            state.team_form, state.players, state.teams
+        ) = (
+            pl.collect_all([
+                full_stats,
+                team_totals,
+                player_form,
+                team_form,
+                running_state(
+                    player_rows, "Player", PLAYER_AVERAGED_STATS,
+                    lazy(state.players)
+                ),
+                running_state(
+                    team_rows, "Team", AVERAGED_STATS, lazy(state.teams)
+                ),
+            ], engine="streaming")
+        )
+    METRICS.inc("rows_total", len(full_stats), kind="features", season=season)
+    return full_stats
+
+
+def get_season_data(
+        season: str,
+        fetcher: Fetcher | None = None,
+        use_browser: bool = False,
+        parse_workers: int | None = None,
+        state: SeasonState | None = None
+) -> pl.DataFrame | None:
+    """Pulls all games of a season and builds the feature table
 
     Args:
-        link (str): euroleague page game link
+        season (str): starting year of the season
+        fetcher (Fetcher, optional): Fetcher to use, a cached one if not given
+        use_browser (bool): discover the game links with Selenium
+        parse_workers (int, optional): parser processes, see parse_pages
+        state (SeasonState, optional): state of the already ingested games,
+            only games missing in its manifest get fetched and the running
+            averages continue from it. It gets updated in place.
 
     Returns:
-        pl.DataFrame: DataFrame with all relevant Data From Site
+        pl.DataFrame | None: features of the fetched games, None if there
+        were no new games
     """
+    if state is None:
+        state = SeasonState(season)
+    all_stats, new_games = get_box_scores(
+        season, fetcher, use_browser, parse_workers, state
+    )
+    if all_stats is None:
+        return None
 
-    base_url = f"https://www.euroleaguebasketball.net{link}"
-    site = requests.get(base_url)
+    full_stats = build_features(prepare_box_scores(all_stats), season, state)
+    state.games.update(new_games)
+    return full_stats
 
-    # Open Parser
-    soup = bs(str(site.content), 'html.parser')
-    # Class names for relevant Parts of HTML
-    columns_class = (
-        "game-box-scores-table-grouped-column_"
-        "tableGroupedColumnStatGroupContainer__Oci84"
-    )
-    row_class = (
-        "game-box-scores-table-grouped-column_"
-        "tableGroupedRowStatGroupContainer__wluIz"
+
+def update_season(
+        season: str, full: bool = False, **kwargs
+) -> pl.DataFrame | None:
+    """Adds the games missing in the dataset, box scores and features, and
+    stores the state for the next update
+
+    Args:
+        season (str): starting year of the season
+        full (bool): drop the stored season and process it again
+        **kwargs: passed on to get_box_scores
+
+    Returns:
+        pl.DataFrame | None: features of the new games, None if there were
+        no new games
+    """
+    if full:
+        state = SeasonState(season)
+        for kind in ("box_scores", "features"):
+            store.drop_season(kind, season)
+    else:
+        state = SeasonState.load(season)
+        if state.pending is not None:
+            # The last run appended its rows but crashed before saving the
+            # state, its games are still new and get appended again
+            for kind in ("box_scores", "features"):
+                store.drop_run(kind, season, state.pending)
+    checkpoints = Checkpoints(season)
+
+    all_stats, new_games = get_box_scores(
+        season, state=state, checkpoints=checkpoints,
+        quarantine=Quarantine(season), **kwargs
     )
-    stat_name_class = (
-        "game-box-scores-table-grouped-"
-        "column_groupedTableHeading__XTxR_"
+    if all_stats is None:
+        print("No new games")
+        return None
+
+    prepared = prepare_box_scores(all_stats)
+    METRICS.inc(
+        "rows_total", len(prepared), kind="box_scores", season=season
     )
-    stat_cell_class = (
-        "game-box-scores-table-grouped-column_tableStatCell__4zJlJ"
+    full_stats = build_features(prepared, season, state)
+    with METRICS.stage("write", season=season):
+        run = uuid.uuid4().hex
+        state.begin(run)
+        store.append(prepared, "box_scores", season, run=run)
+        store.append(full_stats, "features", season, run=run)
+        state.games.update(new_games)
+        state.save()
+    checkpoints.clear()
+    return full_stats
+
+
+def backfill(
+        seasons: list[str],
+        full: bool = False,
+        season_workers: int = 4,
+        parse_workers: int | None = None,
+        rate: float = 1.0,
+        use_browser: bool = False,
+        fetcher: Fetcher | None = None,
+        browser_workers: int = 4
+) -> dict[str, Exception]:
+    """Updates several seasons in parallel, all of them share one fetcher
+    and with it one rate limit, cache and connection pool, one pool of
+    parser processes and with use_browser one pool of browsers. Every
+    parsed game is checkpointed, so running the same backfill again after
+    a crash resumes where it stopped.
+
+    Args:
+        seasons (list[str]): starting years of the seasons
+        full (bool): drop the stored seasons and process them again
+        season_workers (int): seasons processed at the same time
+        parse_workers (int, optional): parser processes, all cpus by default
+        rate (float): maximum requests per second of all seasons together
+        use_browser (bool): discover the game links with Selenium
+        fetcher (Fetcher, optional): Fetcher to use instead of a cached one
+            with the given rate
+        browser_workers (int): browsers rendering rounds at the same time
+            with use_browser
+
+    Returns:
+        dict[str, Exception]: seasons that failed with their error
+    """
+    failed = {}
+    with ExitStack() as stack:
+        if fetcher is None:
+            cache = stack.enter_context(ResponseCache())
+            fetcher = stack.enter_context(Fetcher(
+                max_workers=8, rate=rate, cache=cache, is_final=is_final_game
+            ))
+        parse_pool = stack.enter_context(parser_pool(parse_workers))
+        browser_pool = None
+        if use_browser:
+            from browser import BrowserPool
+            browser_pool = stack.enter_context(BrowserPool(browser_workers))
+        season_pool = stack.enter_context(ThreadPoolExecutor(season_workers))
+        futures = {
+            season_pool.submit(
+                update_season, season, full, fetcher=fetcher,
+                use_browser=use_browser, parse_pool=parse_pool,
+                browser_pool=browser_pool
+            ): season
+            for season in seasons
+        }
+        for future in as_completed(futures):
+            season = futures[future]
+            try:
+                future.result()
+                print(f"Season {season} done")
+            except Exception as e:
+                print(f"Season {season} failed: {e}")
+                failed[season] = e
+    return failed
+
+
+def load_season(season: str) -> pl.DataFrame:
+    """Reads the features of a season from the dataset"""
+    return (
+        store.scan("features")
+        .filter(pl.col("season") == int(season))
+        .collect()
     )
 
-    # Class for Player link, regex the name of the Player
-    player_link = "game-box-scores-table-grouped-tab_playerLink__MqVrl"
-    re_player = r"/euroleague/players/([\w-]+)/[\d\w]+/"
-    players = []
-    for link in soup.find_all("a", attrs={"class": player_link}):
-        players.append((
-            link.get("href"), re.match(re_player, link.get("href")).groups()[0]
-        ))
-
-    # Find all the Data Columns for a Team
-    # Save them in List of Columns to be appended later
-    stats_collection = []
-    for element in soup.find_all("div", attrs={"class": columns_class}):
-        col_stats = []
-        col_heads = [
-            stathead.text for stathead in element.find_all(
-                "div", attrs={"class": stat_name_class}
-            )
-        ]
-        for row in element.find_all("div", attrs={"class": row_class}):
-            stats = row.find_all("div", attrs={"class": stat_cell_class})
-            if stats:
-                col_stats.append([stat.text for stat in stats])
-        schema = {}
-        for i in col_heads:
-            schema["i"]: str
-        stats_df = pl.DataFrame(data=col_stats, schema=schema)
-        stats_collection.append(stats_df)
-
-    if len(stats_collection) == 0:
-        return None
-    boxscore_t1 = pl.concat(stats_collection[:9])
-    boxscore_t2 = pl.concat(stats_collection[9:])
-
-    # TODO: Maybe put in seperate File for ease of reading
-    stat_names = pl.Series(values=[
-        "Minutes", "Points",
-        "2P_Made/Attempted", "2P_Percentage",
-        "3P_Made/Attempted", "3P_Percentage",
-        "FTP_Made/Attempted", "FTP_Percentage",
-        "O_Rebounds", "D_Rebounds", "Total_Rebounds",
-        "Assists", "Steals", "Turnovers",
-        "Blocks", "ReceivedBlocks",
-        "FoulsCommited", "FoulReceived",
-        "Effectivity", "PlusMinus"
-    ], name="Stat")
-
-    game_info = get_game_info(soup)
-
-    home_names, away_names = player_column_dicts(
-        players, boxscore_t1.columns, boxscore_t2.columns, soup
+
+def parse_seasons(values: list[str]) -> list[str]:
+    """Takes season years and ranges like 2018-2023, returns all years.
+    A season in the naming of the site, e.g. 2023-24, is its starting year.
+
+    Raises:
+        ValueError: if a value is no year, range or season name, or a range
+            ends before it starts
+    """
+    seasons = []
+    for value in values:
+        start, _, end = value.partition("-")
+        if not start.isdigit() or not (end or start).isdigit():
+            raise ValueError(f"No season or range of seasons: {value}")
+        first = int(start)
+        if len(end) == 2:
+            if int(end) != (first + 1) % 100:
+                raise ValueError(
+                    f"{value} is no season, it would be "
+                    f"{first}-{(first + 1) % 100:02d}"
+                )
+            last = first
+        else:
+            last = int(end or start)
+        if last < first:
+            raise ValueError(f"Range {value} ends before it starts")
+        seasons.extend(str(season) for season in range(first, last + 1))
+    return list(dict.fromkeys(seasons))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pull euroleague seasons into the processed dataset"
     )
-    boxscore_t1 = (
-        boxscore_t1
-        .rename(home_names)  # add player names to as column names
-        .with_columns(stat_names)  # add stat names to rows
-        .transpose(  # Pivot Boxscore to have player names as data Entry
-            include_header=True,
-            header_name="Player",
-            column_names="Stat"
-        )
-        .with_columns(
-            pl.lit(game_info["home_team"]).alias("Team"),
-            pl.lit(game_info["away_team"]).alias("Opponent"),
-            pl.lit(True).alias("Home")
-        )
+    parser.add_argument(
+        "seasons", nargs="+",
+        help="starting years of the seasons, ranges like 2018-2023 and "
+             "season names like 2023-24 work too"
     )
-    boxscore_t2 = (
-        boxscore_t2
-        .rename(away_names)
-        .with_columns(stat_names)
-        .transpose(
-            include_header=True,
-            header_name="Player",
-            column_names="Stat"
-        )
-        .with_columns(
-            pl.lit(game_info["away_team"]).alias("Team"),
-            pl.lit(game_info["home_team"]).alias("Opponent"),
-            pl.lit(False).alias("Home")
-        )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="drop the stored seasons and process them again"
     )
-    boxscore: pl.DataFrame = pl.concat([boxscore_t1, boxscore_t2])
-    percent_format = r"([\d.]+)"
-    # Do all the Type conversions to String, float, etc
-    boxscore = (
-        boxscore
-        .filter(pl.col("Player").ne("Team"))
-        .with_columns(
-            pl.col("Minutes").str
-            .extract_groups(r"(?P<Minutes>\d+):(?P<Seconds>\d+)"),
-            pl.col("Points").cast(pl.Int16),
-            pl.col("2P_Made/Attempted").str.extract_groups(
-                r"(?P<TwoPMakes>\d{1,2})/(?P<TwoPAttempts>\d{1,2})"
-            ),
-            pl.col("3P_Made/Attempted").str.extract_groups(
-                r"(?P<ThreePMakes>\d{1,2})/(?P<ThreePAttempts>\d{1,2})"
-            ),
-            pl.col("FTP_Made/Attempted").str.extract_groups(
-                r"(?P<FTMakes>\d{1,2})/(?P<FTAttempts>\d{1,2})"
-            ),
-            pl.col("2P_Percentage").str.extract(percent_format, 1)
-            .cast(pl.Float32).truediv(100),
-            pl.col("3P_Percentage").str.extract(percent_format, 1)
-            .cast(pl.Float32).truediv(100),
-            pl.col("FTP_Percentage").str.extract(percent_format, 1)
-            .cast(pl.Float32).truediv(100),
-            pl.col("O_Rebounds").cast(pl.Int16),
-            pl.col("D_Rebounds").cast(pl.Int16),
-            pl.col("Total_Rebounds").cast(pl.Int16),
-            pl.col('Assists').cast(pl.Int16),
-            pl.col('Steals').cast(pl.Int16),
-            pl.col('Turnovers').cast(pl.Int16),
-            pl.col('Blocks').cast(pl.Int16),
-            pl.col('ReceivedBlocks').cast(pl.Int16),
-            pl.col('FoulsCommited').cast(pl.Int16),
-            pl.col('FoulReceived').cast(pl.Int16),
-            pl.col('Effectivity').cast(pl.Int16),
-            pl.when(pl.col("PlusMinus") == "")
-            .then(pl.lit("0"))
-            .otherwise(pl.col("PlusMinus"))
-            .cast(pl.Int16).alias("PlusMinus")
-        )
-        .unnest([
-            "2P_Made/Attempted", "3P_Made/Attempted",
-            "FTP_Made/Attempted", "Minutes"
-        ])
-        .with_columns(
-            Seconds=(
-                pl.col("Minutes")
-                .cast(pl.Int64)
-                .mul(60)
-                .add(pl.col("Seconds")
-                     .cast(pl.Int64))
-            ),
-            Date=pl.lit(game_info["date"]),
-            Round=pl.lit(game_info["round"]),
-            GameTime=pl.lit(game_info["time"])
-        )
-        .drop("Minutes")
+    parser.add_argument(
+        "--season-workers", type=int, default=4,
+        help="seasons processed at the same time"
     )
-
-    return boxscore
-
-
-def get_season_data(season: str):
-    res = load_with_selenium(season)
-    print(len(res))
-    boxscores = []
-    for link in tqdm.tqdm(res):
-        game_data = get_game_data(link)
-        if game_data is not None:
-            boxscores.append(game_data)
-        time.sleep(1.5)
-
-    all_stats: pl.DataFrame = pl.concat(boxscores).rechunk()
-
-    all_stats.shape
-    print(all_stats.schema)
-
-    team_totals = (
-        all_stats
-        .filter(pl.col("Player").eq("Total"))
-        .sort("Date")
-        .with_columns(
-            pl.col("Round").cast(pl.Int16),
-            pl.col("TwoPMakes").cast(pl.Int16),
-            pl.col("TwoPAttempts").cast(pl.Int16),
-            pl.col("ThreePMakes").cast(pl.Int16),
-            pl.col("ThreePAttempts").cast(pl.Int16),
-            pl.col("FTMakes").cast(pl.Int16),
-            pl.col("FTAttempts").cast(pl.Int16),
-            game_number=pl.col("Player").cum_count().over("Team")
-        )
-        .select(
-            avg_points=pl.col('Points').cum_sum().over("Team").truediv("game_number"),
-            avg_TwoPMakes=pl.col("TwoPMakes").cum_sum().over("Team").truediv("game_number"),
-            avg_TwoPAttempts=pl.col("TwoPAttempts").cum_sum().over("Team").truediv("game_number"),
-            avg_2P_Percentage=pl.col("2P_Percentage").cum_sum().over("Team").truediv("game_number"),
-            avg_ThreePMakes=pl.col("ThreePMakes").cum_sum().over("Team").truediv("game_number"),
-            avg_ThreePAttempts=pl.col("ThreePAttempts").cum_sum().over("Team").truediv("game_number"),
-            avg_3P_Percentage=pl.col("3P_Percentage").cum_sum().over("Team").truediv("game_number"),
-            avg_FTMakes=pl.col("FTMakes").cum_sum().over("Team").truediv("game_number"),
-            avg_FTAttempts=pl.col("FTAttempts").cum_sum().over("Team").truediv("game_number"),
-            avg_FTP_Percentage=pl.col("FTP_Percentage").cum_sum().over("Team").truediv("game_number"),
-            avg_O_Rebounds=pl.col("O_Rebounds").cum_sum().over("Team").truediv("game_number"),
-            avg_D_Rebounds=pl.col("D_Rebounds").cum_sum().over("Team").truediv("game_number"),
-            avg_Total_Rebounds=pl.col("Total_Rebounds").cum_sum().over("Team").truediv("game_number"),
-            avg_Assists=pl.col("Assists").cum_sum().over("Team").truediv("game_number"),
-            avg_Steals=pl.col("Steals").cum_sum().over("Team").truediv("game_number"),
-            avg_Turnovers=pl.col("Turnovers").cum_sum().over("Team").truediv("game_number"),
-            avg_Blocks=pl.col("Blocks").cum_sum().over("Team").truediv("game_number"),
-            avg_ReceivedBlocks=pl.col("ReceivedBlocks").cum_sum().over("Team").truediv("game_number"),
-            avg_FoulsCommited=pl.col("FoulsCommited").cum_sum().over("Team").truediv("game_number"),
-            avg_FoulReceived=pl.col("FoulReceived").cum_sum().over("Team").truediv("game_number"),
-            avg_Effectivity=pl.col("Effectivity").cum_sum().over("Team").truediv("game_number"),
-            avg_PlusMinus=pl.col("PlusMinus").cum_sum().over("Team").truediv("game_number"),
-            game_number=pl.col("game_number"),
-            Team=pl.col("Team"),
-            Player=pl.col("Player"),
-            Round=pl.col("Round")
-        )
+    parser.add_argument(
+        "--parse-workers", type=int, default=None,
+        help="parser processes, all cpus by default"
     )
-
-    stats_with_running_averages = (
-        all_stats
-        .filter(pl.col("Player").ne("Total"))
-        .sort("Date")
-        .with_columns(
-            pl.col("Round").cast(pl.Int16),
-            pl.col("TwoPMakes").cast(pl.Int16),
-            pl.col("TwoPAttempts").cast(pl.Int16),
-            pl.col("ThreePMakes").cast(pl.Int16),
-            pl.col("ThreePAttempts").cast(pl.Int16),
-            pl.col("FTMakes").cast(pl.Int16),
-            pl.col("FTAttempts").cast(pl.Int16),
-            game_number=pl.col("Player").cum_count().over("Player")
-        )
-        .with_columns(
-            avg_seconds=pl.col("Seconds").cum_sum().over("Player").truediv("game_number"),
-            avg_points=pl.col('Points').cum_sum().over("Player").truediv("game_number"),
-            avg_TwoPMakes=pl.col("TwoPMakes").cum_sum().over("Player").truediv("game_number"),
-            avg_TwoPAttempts=pl.col("TwoPAttempts").cum_sum().over("Player").truediv("game_number"),
-            avg_2P_Percentage=pl.col("2P_Percentage").cum_sum().over("Player").truediv("game_number"),
-            avg_ThreePMakes=pl.col("ThreePMakes").cum_sum().over("Player").truediv("game_number"),
-            avg_ThreePAttempts=pl.col("ThreePAttempts").cum_sum().over("Player").truediv("game_number"),
-            avg_3P_Percentage=pl.col("3P_Percentage").cum_sum().over("Player").truediv("game_number"),
-            avg_FTMakes=pl.col("FTMakes").cum_sum().over("Player").truediv("game_number"),
-            avg_FTAttempts=pl.col("FTAttempts").cum_sum().over("Player").truediv("game_number"),
-            avg_FTP_Percentage=pl.col("FTP_Percentage").cum_sum().over("Player").truediv("game_number"),
-            avg_O_Rebounds=pl.col("O_Rebounds").cum_sum().over("Player").truediv("game_number"),
-            avg_D_Rebounds=pl.col("D_Rebounds").cum_sum().over("Player").truediv("game_number"),
-            avg_Total_Rebounds=pl.col("Total_Rebounds").cum_sum().over("Player").truediv("game_number"),
-            avg_Assists=pl.col("Assists").cum_sum().over("Player").truediv("game_number"),
-            avg_Steals=pl.col("Steals").cum_sum().over("Player").truediv("game_number"),
-            avg_Turnovers=pl.col("Turnovers").cum_sum().over("Player").truediv("game_number"),
-            avg_Blocks=pl.col("Blocks").cum_sum().over("Player").truediv("game_number"),
-            avg_ReceivedBlocks=pl.col("ReceivedBlocks").cum_sum().over("Player").truediv("game_number"),
-            avg_FoulsCommited=pl.col("FoulsCommited").cum_sum().over("Player").truediv("game_number"),
-            avg_FoulReceived=pl.col("FoulReceived").cum_sum().over("Player").truediv("game_number"),
-            avg_Effectivity=pl.col("Effectivity").cum_sum().over("Player").truediv("game_number"),
-            avg_PlusMinus=pl.col("PlusMinus").cum_sum().over("Player").truediv("game_number")
-        )
+    parser.add_argument(
+        "--rate", type=float, default=1.0,
+        help="maximum requests per second over all seasons"
     )
-
-    for_merge_totals = (
-        team_totals
-        .filter(pl.col("Round").ne(34))
-        .with_columns(
-            team_round_shorthand=pl.concat_str(pl.col("Team"), pl.col("Round"))
-        )
+    parser.add_argument(
+        "--browser", action="store_true",
+        help="discover the game links with Selenium"
     )
-
-    player_stats_for_merged = (
-        stats_with_running_averages
-        .with_columns(
-            pl.col("Round").sub(1).alias("merge_round")
-        )
-        .with_columns(
-            pl.when(pl.col("merge_round") == 0)
-            .then(1)
-            .otherwise(pl.col("merge_round"))
-            .alias("merge_round")
-        )
-        .with_columns(
-            team_round_shorthand_own=pl.concat_str(
-                pl.col("Team"),
-                pl.col("merge_round")
-            ),
-            team_round_shorthand_opponent=pl.concat_str(
-                pl.col("Opponent"),
-                pl.col("merge_round")
-            )
-        )
+    parser.add_argument(
+        "--browser-workers", type=int, default=4,
+        help="browsers rendering rounds at the same time with --browser"
     )
-
-    merged_stats = (
-        player_stats_for_merged
-        .join(
-            for_merge_totals,
-            left_on="team_round_shorthand_own",
-            right_on="team_round_shorthand",
-            suffix="_own_team"
-        )
-        .join(
-            for_merge_totals,
-            left_on="team_round_shorthand_opponent",
-            right_on="team_round_shorthand",
-            suffix="_opponent"
-        )
-        .select(
-            pl.exclude([
-                "team_round_shorthand_own", "team_round_shorthand_opponent",
-                "game_number_own_team", "Team_own_team", "Player_own_team",
-                "Round_own_team", "game_number_opponent", "Team_opponent",
-                "Player_opponent", "Round_opponent"
-            ])
-        )
+    parser.add_argument(
+        "--metrics", default=REPORT_PATH,
+        help="JSON-lines file the run report gets appended to"
     )
-    season_num = int(season)
-    season_name = f"{season_num-2000}_{season_num-1999}"
-    team_stats_path = path.join(
-        ".", "data", "external", f"Team stats_{season_name}.xlsx"
+    parser.add_argument(
+        "--prometheus", default=None,
+        help="also write the metrics to this node exporter textfile"
     )
-    stats_df = pl.read_excel(
-        team_stats_path, sheet_name="stats_clean", engine="xlsx2csv"
+    parser.add_argument(
+        "--profile", nargs="+", default=[], metavar="STAGE",
+        help="profile stages, e.g. discover fetch_parse reshape features "
+             "write. Profiled stages of several seasons run one at a time, "
+             "parsing is only profiled with --parse-workers 0"
     )
-
-    prepared_team_stats = (
-        stats_df
-        .filter(pl.col("TEAM").is_not_null())
-        .select([
-            "TEAM", "PACE", "POSS", "OFF RTG",	"DEF RTG",	"NET RTG", "OR%",
-            "DR%", "TR%", "AST%", "AST Ratio", "AST/TO", "TO Ratio", "ST%",
-            "PF 100 Poss", "DF 100 Poss", "BLK%"
-        ])
-        .with_columns(
-            pl.col("ST%").truediv(100),
-            pl.col("BLK%").truediv(100),
-        )
+    parser.add_argument(
+        "--profiler", choices=["cprofile", "pyinstrument"],
+        default="cprofile"
     )
-
-    full_stats = (
-        merged_stats
-        .join(
-            prepared_team_stats,
-            left_on="Team",
-            right_on="TEAM",
-            suffix="_own_team"
-        )
-        .join(
-            prepared_team_stats,
-            left_on="Opponent",
-            right_on="TEAM",
-            suffix="_opponent"
-        )
-        .with_columns(
-            Season=pl.lit(season_name)
-        )
+    args = parser.parse_args()
+    try:
+        seasons = parse_seasons(args.seasons)
+    except ValueError as e:
+        parser.error(str(e))
+    METRICS.profile(args.profile, args.profiler)
+    failed = backfill(
+        seasons,
+        full=args.full,
+        season_workers=args.season_workers,
+        parse_workers=args.parse_workers,
+        rate=args.rate,
+        use_browser=args.browser,
+        browser_workers=args.browser_workers
     )
-    return full_stats
-
-
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Only run with Season starting year specified")
-        exit()
-    season = sys.argv[1]
-    stats = get_season_data(season)
-    print(stats.head())
-    stats.write_parquet(f"./data/processed/season_{season}.pq")
+    report = METRICS.write_report(
+        args.metrics, seasons=args.seasons, failed=sorted(failed)
+    )
+    print(json.dumps(report["summary"], indent=2))
+    if args.prometheus:
+        METRICS.write_prometheus(args.prometheus)
+    if failed:
+        sys.exit(1)
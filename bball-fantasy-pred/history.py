@@ -0,0 +1,235 @@
+
+from datetime import date
+from typing import Iterable
+from features import (
+    AVERAGED_STATS, PLAYER_AVERAGED_STATS, prepare_box_scores, team_averages
+)
+import numpy as np
+import polars as pl
+import store
+
+PLAYER_COLUMNS = ["game_number", *PLAYER_AVERAGED_STATS.values()]
+TEAM_COLUMNS = ["game_number", *AVERAGED_STATS.values()]
+
+# Composite key of an index entry: code of the player or team in the high
+# bits, days since epoch in the low ones
+_DAY_BITS = 32
+
+
+def _days(dates) -> np.ndarray:
+    """Days since epoch of dates, date objects, strings or datetime64"""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class HistoryIndex:
+    """As-of index over the rows of players or teams, one contiguous block
+    of rows per key sorted by date
+
+    The values of all rows are one float32 matrix, a lookup is a binary
+    search over the sorted (key, date) pairs and a row read.
+
+    Args:
+        rows (pl.DataFrame): rows with key, Date and columns
+        key (str): column to index by, Player or Team
+        columns (list[str]): numeric columns returned by lookups
+    """
+
+    def __init__(self, rows: pl.DataFrame, key: str, columns: list[str]):
+        self.key = key
+        self.columns = columns
+        names = rows[key].cast(pl.String).to_numpy()
+        self.names, codes = np.unique(names, return_inverse=True)
+        self.codes = {name: i for i, name in enumerate(self.names)}
+        days = _days(rows["Date"].to_numpy())
+        keys = (codes.astype(np.int64) << _DAY_BITS) | days
+        order = np.argsort(keys, kind="stable")
+
+        self.keys = keys[order]
+        self.days = days[order]
+        self.values = np.ascontiguousarray(
+            rows.select(columns).to_numpy().astype(np.float32)[order]
+        )
+        # Block of every key in the sorted arrays
+        bounds = np.searchsorted(
+            self.keys, np.arange(len(self.names) + 1) << _DAY_BITS
+        )
+        self.starts, self.ends = bounds[:-1], bounds[1:]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.codes
+
+    def _row(self, position: int) -> dict:
+        row = dict(zip(self.columns, self.values[position].tolist()))
+        row["Date"] = np.datetime64(int(self.days[position]), "D").item()
+        return row
+
+    def latest(self, name: str, before: date | str) -> dict | None:
+        """Row of the last game of name strictly before a date
+
+        Returns:
+            dict | None: columns and Date of that game, None if there is
+            none
+        """
+        code = self.codes.get(name)
+        if code is None:
+            return None
+        start, end = self.starts[code], self.ends[code]
+        position = start + np.searchsorted(
+            self.days[start:end], _days(before), side="left"
+        ) - 1
+        return None if position < start else self._row(position)
+
+    def at(self, name: str, day: date | str) -> dict | None:
+        """Row of the game of name on day, None if it didn't play"""
+        code = self.codes.get(name)
+        if code is None:
+            return None
+        start, end = self.starts[code], self.ends[code]
+        target = _days(day)
+        position = start + np.searchsorted(self.days[start:end], target)
+        if position == end or self.days[position] != target:
+            return None
+        return self._row(position)
+
+    def positions(
+            self, names: Iterable[str], before: Iterable
+    ) -> np.ndarray:
+        """Vectorized latest, the row position for every name and date
+        pair or -1 if there is no game before the date"""
+        codes = np.array(
+            [self.codes.get(name, -1) for name in names], dtype=np.int64
+        )
+        targets = (np.maximum(codes, 0) << _DAY_BITS) | _days(list(before))
+        positions = np.searchsorted(self.keys, targets, side="left") - 1
+        safe = np.maximum(positions, 0)
+        found = (
+            (codes >= 0) & (positions >= 0)
+            & (self.keys[safe] >> _DAY_BITS == codes)
+        )
+        return np.where(found, positions, -1)
+
+    def lookup(
+            self, names: Iterable[str], before: Iterable, suffix: str = ""
+    ) -> pl.DataFrame:
+        """Batch version of latest, one row per name and date pair in
+        input order with nulls where there is no earlier game
+
+        Args:
+            names (Iterable[str]): players or teams
+            before (Iterable): dates the games have to lie before
+            suffix (str): appended to the returned column names
+
+        Returns:
+            pl.DataFrame: Date of the found game and the columns
+        """
+        positions = self.positions(names, before)
+        found = positions >= 0
+        safe = np.maximum(positions, 0)
+        values = np.where(found[:, None], self.values[safe], np.nan)
+        last_game = pl.Series(
+            self.days[safe].astype("datetime64[D]")
+        ).scatter(np.flatnonzero(~found), None)
+        return pl.DataFrame({
+            f"last_game{suffix}": last_game,
+            **{
+                f"{column}{suffix}": pl.Series(
+                    values[:, i], nan_to_null=True
+                )
+                for i, column in enumerate(self.columns)
+            }
+        })
+
+
+class PlayerHistory:
+    """Running averages of every player and team by date, for answering
+    pre-game lookups without scanning the dataset
+
+    Args:
+        players (HistoryIndex): player features, keyed by player slug
+        teams (HistoryIndex): team total averages, keyed by team name
+    """
+
+    def __init__(self, players: HistoryIndex, teams: HistoryIndex):
+        self.players = players
+        self.teams = teams
+
+    @classmethod
+    def load(
+            cls,
+            seasons: list[str] | None = None,
+            base_dir: str = store.DATASET_DIR
+    ) -> "PlayerHistory":
+        """Builds the index from the processed dataset
+
+        Args:
+            seasons (list[str], optional): seasons to load, all by default
+            base_dir (str): root directory of the dataset
+        """
+        def scan(kind: str) -> pl.LazyFrame:
+            frame = store.scan(kind, base_dir)
+            if seasons is not None:
+                frame = frame.filter(
+                    pl.col("season").is_in([int(s) for s in seasons])
+                )
+            return frame
+
+        features = (
+            scan("features")
+            .select("Player", "Date", *PLAYER_COLUMNS)
+            .collect()
+        )
+        box_scores = scan("box_scores").collect()
+        if features.is_empty() or box_scores.is_empty():
+            raise ValueError(f"No stored seasons in {base_dir}")
+        # Team averages run per season like the player ones
+        teams = pl.concat([
+            team_averages(prepare_box_scores(season_scores))
+            for season_scores in box_scores.partition_by("season")
+        ])
+        return cls(
+            HistoryIndex(features, "Player", PLAYER_COLUMNS),
+            HistoryIndex(teams, "Team", TEAM_COLUMNS)
+        )
+
+    def latest(
+            self, player: str, team: str, opponent: str, before: date | str
+    ) -> dict:
+        """Latest averages of a player and both teams before a game
+
+        Returns:
+            dict: player, own_team and opponent rows, None where there is no
+            earlier game
+        """
+        return {
+            "player": self.players.latest(player, before),
+            "own_team": self.teams.latest(team, before),
+            "opponent": self.teams.latest(opponent, before),
+        }
+
+    def slate(self, games: pl.DataFrame) -> pl.DataFrame:
+        """Batch lookup for a whole slate of lineup slots
+
+        Args:
+            games (pl.DataFrame): Player, Team, Opponent and Date per slot
+
+        Returns:
+            pl.DataFrame: games with the latest player averages and the
+            team averages suffixed _own_team and _opponent
+        """
+        dates = games["Date"].to_list()
+        return pl.concat(
+            [
+                games,
+                self.players.lookup(games["Player"].to_list(), dates),
+                self.teams.lookup(
+                    games["Team"].to_list(), dates, "_own_team"
+                ),
+                self.teams.lookup(
+                    games["Opponent"].to_list(), dates, "_opponent"
+                ),
+            ],
+            how="horizontal"
+        )
@@ -0,0 +1,176 @@
+
+from dataclasses import dataclass, field
+from os import path
+import polars as pl
+import shutil
+import json
+import os
+import re
+
+PROCESSED_DIR = path.join(".", "data", "processed")
+CHECKPOINT_DIR = path.join(".", "data", "interim", "checkpoints")
+
+re_game_code = re.compile(r"/(E\d{4})/(\d+)/")
+
+
+def game_code(link: str) -> str:
+    """Takes a game link and returns its code, e.g. E2023_12"""
+    match = re_game_code.search(link)
+    if match is None:
+        raise ValueError(f"No game code in link {link}")
+    return f"{match[1]}_{match[2]}"
+
+
+@dataclass
+class SeasonState:
+    """What is needed to add new games to an already processed season
+
+    Attributes:
+        games: codes of all ingested games, the manifest
+        rounds: codes of the games found on the game center page per round
+        players: running_state per player
+        teams: running_state per team
+        team_totals: running team averages of all ingested games, needed to
+            merge the previous round into new player rows
+        player_form: last games of every player for the form features
+        team_form: last games of every team for the form features
+        pending: id of a run that started appending to the dataset but
+            never saved its state, its files have to be dropped
+    """
+    season: str
+    games: set[str] = field(default_factory=set)
+    rounds: dict[int, list[str]] = field(default_factory=dict)
+    players: pl.DataFrame | None = None
+    teams: pl.DataFrame | None = None
+    team_totals: pl.DataFrame | None = None
+    player_form: pl.DataFrame | None = None
+    team_form: pl.DataFrame | None = None
+    pending: str | None = None
+
+    @staticmethod
+    def directory(season: str, base_dir: str = PROCESSED_DIR) -> str:
+        return path.join(base_dir, f"state_{season}")
+
+    def new_links(self, links: list[str]) -> list[str]:
+        return [link for link in links if game_code(link) not in self.games]
+
+    def complete_rounds(self) -> set[int]:
+        """Rounds whose games are all ingested, those need no discovery"""
+        return {
+            round for round, codes in self.rounds.items()
+            if codes and self.games.issuperset(codes)
+        }
+
+    @classmethod
+    def load(cls, season: str, base_dir: str = PROCESSED_DIR):
+        """Loads the state of a season, empty if it was never processed"""
+        state_dir = cls.directory(season, base_dir)
+        if not path.exists(state_dir) and path.exists(state_dir + ".old"):
+            # save got interrupted between swapping the directories
+            os.replace(state_dir + ".old", state_dir)
+        pending = cls.pending_run(season, base_dir)
+        manifest_path = path.join(state_dir, "manifest.json")
+        if not path.exists(manifest_path):
+            return cls(season, pending=pending)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        return cls(
+            season,
+            set(manifest["games"]),
+            {int(r): codes for r, codes in manifest["rounds"].items()},
+            pl.read_parquet(path.join(state_dir, "players.pq")),
+            pl.read_parquet(path.join(state_dir, "teams.pq")),
+            pl.read_parquet(path.join(state_dir, "team_totals.pq")),
+            pl.read_parquet(path.join(state_dir, "player_form.pq")),
+            pl.read_parquet(path.join(state_dir, "team_form.pq")),
+            pending,
+        )
+
+    @classmethod
+    def pending_run(
+            cls, season: str, base_dir: str = PROCESSED_DIR
+    ) -> str | None:
+        """Id of the run marked pending in the stored state of a season,
+        None if the last run saved its state"""
+        state_dir = cls.directory(season, base_dir)
+        for directory in (state_dir, state_dir + ".old"):
+            if path.exists(directory):
+                pending_path = path.join(directory, "pending")
+                if not path.exists(pending_path):
+                    return None
+                with open(pending_path) as f:
+                    return f.read().strip()
+        return None
+
+    def begin(self, run: str, base_dir: str = PROCESSED_DIR) -> None:
+        """Marks run as pending in the stored state before it appends to
+        the dataset. save swaps in a directory without the mark, so it
+        only survives if the run crashes in between."""
+        state_dir = self.directory(self.season, base_dir)
+        os.makedirs(state_dir, exist_ok=True)
+        with open(path.join(state_dir, "pending"), "w") as f:
+            f.write(run)
+        self.pending = run
+
+    def save(self, base_dir: str = PROCESSED_DIR) -> None:
+        """Writes the state into a new directory and swaps it with the old
+        one afterwards, so an interrupted save keeps the previous state"""
+        state_dir = self.directory(self.season, base_dir)
+        tmp_dir = state_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        self.players.write_parquet(path.join(tmp_dir, "players.pq"))
+        self.teams.write_parquet(path.join(tmp_dir, "teams.pq"))
+        self.team_totals.write_parquet(path.join(tmp_dir, "team_totals.pq"))
+        self.player_form.write_parquet(path.join(tmp_dir, "player_form.pq"))
+        self.team_form.write_parquet(path.join(tmp_dir, "team_form.pq"))
+        with open(path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(
+                {
+                    "season": self.season,
+                    "games": sorted(self.games),
+                    "rounds": self.rounds
+                },
+                f
+            )
+
+        old_dir = state_dir + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if path.exists(state_dir):
+            os.replace(state_dir, old_dir)
+        os.replace(tmp_dir, state_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.pending = None
+
+
+class Checkpoints:
+    """Parsed stat cells of single games of a season, see
+    parsing.box_score_cells, written as soon as a game is parsed so a
+    crashed run can resume without parsing it again
+
+    Args:
+        season (str): starting year of the season
+        base_dir (str): directory with one subdirectory per season
+    """
+
+    def __init__(self, season: str, base_dir: str = CHECKPOINT_DIR):
+        self.directory = path.join(base_dir, season)
+
+    def path(self, code: str) -> str:
+        return path.join(self.directory, f"{code}.pq")
+
+    def __contains__(self, code: str) -> bool:
+        return path.exists(self.path(code))
+
+    def load(self, code: str) -> pl.DataFrame:
+        return pl.read_parquet(self.path(code))
+
+    def save(self, code: str, cells: pl.DataFrame) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path(code) + ".tmp"
+        cells.write_parquet(tmp_path)
+        os.replace(tmp_path, self.path(code))
+
+    def clear(self) -> None:
+        """Removes the checkpoints once the season is stored"""
+        shutil.rmtree(self.directory, ignore_errors=True)
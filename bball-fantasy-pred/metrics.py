@@ -0,0 +1,311 @@
+
+from contextlib import contextmanager
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterator
+from os import path
+import threading
+import time
+import json
+import uuid
+import os
+
+REPORT_PATH = path.join(".", "data", "interim", "metrics.jsonl")
+PROFILE_DIR = path.join(".", "data", "interim", "profiles")
+PROMETHEUS_PREFIX = "bball_"
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum and count"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> dict[str, int]:
+        """Observations up to every bucket bound, as prometheus wants it"""
+        result = {}
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result[str(bound)] = total
+        result["+Inf"] = self.count
+        return result
+
+
+class Metrics:
+    """Counters, histograms and stage timers of a run
+
+    All methods are thread safe, the fetcher threads and the season
+    threads of a backfill report into the same instance. Metrics are keyed
+    by name and labels, e.g.
+
+        METRICS.inc("http_requests_total", status=200)
+        with METRICS.stage("features", season="2023"):
+            ...
+
+    Stages listed with profile() run under cProfile or pyinstrument and
+    leave a profile per run in the profile directory. Both only see the
+    thread that entered the stage and only one profiler can run at a
+    time, so profiled stages of different threads (e.g. seasons of a
+    backfill) wait for each other and a profiled stage nested in another
+    one isn't profiled on its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._profiling = threading.local()
+        self.profile_stages: set[str] = set()
+        self.profiler = "cprofile"
+        self.profile_dir = PROFILE_DIR
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets everything, the next report starts from here"""
+        with self._lock:
+            self.run_id = uuid.uuid4().hex
+            self.started = time.time()
+            self.counters: dict[tuple[str, Labels], float] = defaultdict(float)
+            self.histograms: dict[tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self.counters[name, _labels(labels)] += value
+
+    def observe(
+            self,
+            name: str,
+            value: float,
+            buckets: tuple[float, ...] = LATENCY_BUCKETS,
+            **labels
+    ) -> None:
+        key = name, _labels(labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def profile(
+            self,
+            stages: list[str],
+            profiler: str = "cprofile",
+            directory: str = PROFILE_DIR
+    ) -> None:
+        """Profiles every run of the given stages
+
+        Args:
+            stages (list[str]): names as passed to stage()
+            profiler (str): "cprofile" (.prof files for pstats/snakeviz) or
+                "pyinstrument" (.html), the latter has to be installed
+            directory (str): where the profiles are written
+        """
+        if profiler not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiler {profiler}")
+        self.profile_stages = set(stages)
+        self.profiler = profiler
+        self.profile_dir = directory
+
+    @contextmanager
+    def stage(self, name: str, **labels) -> Iterator[None]:
+        """Times the block as stage name, counts its runs and profiles it
+        if the stage was passed to profile()"""
+        profiler = None
+        if name in self.profile_stages and not getattr(
+            self._profiling, "active", False
+        ):
+            # Taken before the timer starts, the wait isn't stage time
+            self._profile_lock.acquire()
+            self._profiling.active = True
+            try:
+                profiler = self._start_profiler()
+            except BaseException:
+                self._profiling.active = False
+                self._profile_lock.release()
+                raise
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.inc("stage_seconds_total", elapsed, stage=name, **labels)
+            self.inc("stage_runs_total", stage=name, **labels)
+            if profiler is not None:
+                try:
+                    self._stop_profiler(profiler, name, labels)
+                finally:
+                    self._profiling.active = False
+                    self._profile_lock.release()
+
+    def _start_profiler(self):
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, name: str, labels: dict) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stem = "_".join([name, *[str(v) for _, v in _labels(labels)]])
+        stem = f"{stem}_{time.strftime('%Y%m%d-%H%M%S')}"
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            with open(path.join(self.profile_dir, f"{stem}.html"), "w") as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            profiler.dump_stats(path.join(self.profile_dir, f"{stem}.prof"))
+
+    def counter(self, name: str, **labels) -> float:
+        """Sum of a counter over all label values that match labels"""
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(
+                value for (key, key_labels), value in self.counters.items()
+                if key == name and wanted <= set(key_labels)
+            )
+
+    def summary(self) -> dict:
+        """The numbers worth looking at first: time per stage, requests,
+        bytes, cache hit rate and rows"""
+        stages = defaultdict(float)
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                if name == "stage_seconds_total":
+                    stages[dict(labels)["stage"]] += value
+        lookups = self.counter("cache_lookups_total")
+        hits = lookups - self.counter("cache_lookups_total", result="miss")
+        return {
+            "stage_seconds": dict(stages),
+            "http_requests": self.counter("http_requests_total"),
+            "http_bytes": self.counter("http_bytes_total"),
+            "cache_hit_rate": hits / lookups if lookups else None,
+            "games": self.counter("games_total"),
+            "invalid_games": self.counter("games_invalid_total"),
+            "rows": self.counter("rows_total"),
+        }
+
+    def snapshot(self) -> dict:
+        """Everything recorded since the last reset as plain data"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": histogram.cumulative(),
+                    "sum": histogram.sum,
+                    "count": histogram.count,
+                }
+                for (name, labels), histogram in sorted(
+                    self.histograms.items(), key=lambda item: item[0]
+                )
+            ]
+        return {
+            "run_id": self.run_id,
+            "started": datetime.fromtimestamp(
+                self.started, timezone.utc
+            ).isoformat(),
+            "duration_seconds": time.time() - self.started,
+            "summary": self.summary(),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def write_report(self, report_path: str = REPORT_PATH, **info) -> dict:
+        """Appends the snapshot as one line to a JSON-lines file
+
+        Args:
+            report_path (str): file with one line per run
+            **info: additional fields of the line, e.g. the seasons
+
+        Returns:
+            dict: the written record
+        """
+        record = {**self.snapshot(), **info}
+        directory = path.dirname(report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(report_path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        return record
+
+    def write_prometheus(self, textfile_path: str) -> None:
+        """Writes all metrics in the text format of the node exporter
+        textfile collector, replacing the file atomically"""
+        lines = []
+        snapshot = self.snapshot()
+        typed = set()
+
+        def labels_text(labels: dict) -> str:
+            if not labels:
+                return ""
+            inner = ",".join(
+                f'{key}="{value}"' for key, value in labels.items()
+            )
+            return "{" + inner + "}"
+
+        for counter in snapshot["counters"]:
+            name = PROMETHEUS_PREFIX + counter["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(
+                f"{name}{labels_text(counter['labels'])} {counter['value']}"
+            )
+        for histogram in snapshot["histograms"]:
+            name = PROMETHEUS_PREFIX + histogram["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            labels = histogram["labels"]
+            for bound, count in histogram["buckets"].items():
+                bucket_labels = labels_text({**labels, "le": bound})
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_sum{labels_text(labels)} {histogram['sum']}")
+            lines.append(
+                f"{name}_count{labels_text(labels)} {histogram['count']}"
+            )
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}run_duration_seconds gauge")
+        lines.append(
+            f"{PROMETHEUS_PREFIX}run_duration_seconds "
+            f"{snapshot['duration_seconds']}"
+        )
+
+        directory = path.dirname(textfile_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = textfile_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, textfile_path)
+
+
+# Shared by all modules of a run
+METRICS = Metrics()
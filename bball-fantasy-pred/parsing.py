@@ -0,0 +1,388 @@
+
+from dataclasses import dataclass, field
+from bs4 import BeautifulSoup as bs
+import polars as pl
+import pendulum
+import html
+import re
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # lxml is optional, BeautifulSoup is the fallback
+    lxml_html = None
+
+# Class names for relevant Parts of HTML
+columns_class = (
+    "game-box-scores-table-grouped-column_"
+    "tableGroupedColumnStatGroupContainer__Oci84"
+)
+row_class = (
+    "game-box-scores-table-grouped-column_"
+    "tableGroupedRowStatGroupContainer__wluIz"
+)
+stat_cell_class = (
+    "game-box-scores-table-grouped-column_tableStatCell__4zJlJ"
+)
+player_link = "game-box-scores-table-grouped-tab_playerLink__MqVrl"
+name_div_class = (
+    "game-box-scores-table-grouped-tab_tableGroupedRowsContainer__rmPnn "
+    "game-box-scores-table-grid-sizing_tableGridSizing__KbFAw"
+)
+team_name_class = "club-info_name__xB4rz"
+game_info_class = "event-info_listItem__Iu4ou"
+
+re_player = r"/euroleague/players/([\w-]+)/[\d\w]+/"
+re_info_item = re.compile(
+    rb'<li[^>]*\bclass="(?:[^"]* )?' + re.escape(game_info_class.encode())
+    + rb'(?: [^"]*)?"[^>]*>(.*?)</li>',
+    re.S
+)
+re_tag = re.compile(rb"<[^>]*>")
+re_minutes = r"(\d+):(\d+)"
+re_made_attempted = r"(\d+)/(\d+)"
+re_percentage = r"([\d.]+)"
+
+# Column groups of the box score of one team
+GROUPS_PER_TEAM = 9
+# Stat cells of a box score row in page order
+RAW_STATS = [
+    "Minutes", "Points",
+    "2P_Made/Attempted", "2P_Percentage",
+    "3P_Made/Attempted", "3P_Percentage",
+    "FTP_Made/Attempted", "FTP_Percentage",
+    "O_Rebounds", "D_Rebounds", "Total_Rebounds",
+    "Assists", "Steals", "Turnovers",
+    "Blocks", "ReceivedBlocks",
+    "FoulsCommited", "FoulReceived",
+    "Effectivity", "PlusMinus"
+]
+# Stats that are plain numbers in the page
+COUNT_STATS = RAW_STATS[8:-1]
+# Values of a row in box_score_cells, the game info comes first
+CELL_STATS = [
+    "Player", "Team", "Opponent", "Home", "Date", "Round", "GameTime",
+    *RAW_STATS
+]
+
+# Box score as CellBuffer.box_scores returns it, counts are small enough for
+# UInt8 except for team totals of points and minutes
+BOX_SCORE_SCHEMA = {
+    "Player": pl.Categorical,
+    "Seconds": pl.UInt16,
+    "Points": pl.Int16,
+    "TwoPMakes": pl.UInt8, "TwoPAttempts": pl.UInt8,
+    "2P_Percentage": pl.Float32,
+    "ThreePMakes": pl.UInt8, "ThreePAttempts": pl.UInt8,
+    "3P_Percentage": pl.Float32,
+    "FTMakes": pl.UInt8, "FTAttempts": pl.UInt8,
+    "FTP_Percentage": pl.Float32,
+    "O_Rebounds": pl.UInt8, "D_Rebounds": pl.UInt8,
+    "Total_Rebounds": pl.UInt8,
+    "Assists": pl.UInt8, "Steals": pl.UInt8, "Turnovers": pl.UInt8,
+    "Blocks": pl.UInt8, "ReceivedBlocks": pl.UInt8,
+    "FoulsCommited": pl.UInt8, "FoulReceived": pl.UInt8,
+    "Effectivity": pl.Int16,
+    "PlusMinus": pl.Int16,
+    "Team": pl.Categorical,
+    "Opponent": pl.Categorical,
+    "Home": pl.Boolean,
+    "Date": pl.Date,
+    "Round": pl.UInt8,
+    "GameTime": pl.Categorical,
+}
+
+
+@dataclass
+class RawGame:
+    """Everything needed from a game page, still as strings
+
+    Attributes:
+        players: (link, player slug) of all linked players, home team first
+        team_rows: per team the labels of the rows in the name column, i.e.
+            player names followed by "Team" (optional) and "Total"
+        stat_groups: column groups in page order, 9 per team, each as list of
+            rows holding the stat cells
+        team_names: home and away team name
+        info_items: items of the event info list (round, date, ..., time)
+    """
+    players: list[tuple[str, str]] = field(default_factory=list)
+    team_rows: list[list[str]] = field(default_factory=list)
+    stat_groups: list[list[list[str]]] = field(default_factory=list)
+    team_names: list[str] = field(default_factory=list)
+    info_items: list[str] = field(default_factory=list)
+
+
+def game_info_from(team_names: list[str], info_items: list[str]) -> dict:
+    return {
+        "home_team": team_names[0],
+        "away_team": team_names[1],
+        "round": re.search(r"(\d{1,2})", info_items[0])[0],
+        "date": pendulum.from_format(info_items[1], "D MMM YYYY"),
+        "time": info_items[3]
+    }
+
+
+def get_game_info(soup: bs) -> dict:
+    """Takes a game page and returns relevant data like team names, Date and
+    Time and Round
+
+    Args:
+        soup (bs): BeatifoulSoup4 Object with parsed html
+
+    Returns:
+        dict: dict with contents home_team, away_team, round, date, time
+    """
+    team_names = []
+    for element in soup.find_all("h1", attrs={"class": team_name_class}):
+        team_names.append(element.get_text().strip())
+
+    game_info = []
+    for element in soup.find_all("li", attrs={"class": game_info_class}):
+        game_info.append(element.get_text().strip())
+
+    return game_info_from(team_names, game_info)
+
+
+def _parse_bs4(content: bytes) -> RawGame:
+    soup = bs(content, "html.parser")
+    game = RawGame()
+
+    for link in soup.find_all("a", attrs={"class": player_link}):
+        game.players.append((
+            link.get("href"), re.match(re_player, link.get("href")).groups()[0]
+        ))
+
+    for name_div in soup.find_all("div", attrs={"class": name_div_class}):
+        game.team_rows.append([
+            (row.find("b") or row).get_text().strip()
+            for row in name_div.find_all("div", recursive=False)[2:]
+        ])
+
+    for element in soup.find_all("div", attrs={"class": columns_class}):
+        col_stats = []
+        for row in element.find_all("div", attrs={"class": row_class}):
+            stats = row.find_all("div", attrs={"class": stat_cell_class})
+            if stats:
+                col_stats.append([stat.text for stat in stats])
+        game.stat_groups.append(col_stats)
+
+    for element in soup.find_all("h1", attrs={"class": team_name_class}):
+        game.team_names.append(element.get_text().strip())
+    for element in soup.find_all("li", attrs={"class": game_info_class}):
+        game.info_items.append(element.get_text().strip())
+    return game
+
+
+def _row_label(row) -> str:
+    bold = row.find(".//b")
+    return (row if bold is None else bold).text_content().strip()
+
+
+def _parse_lxml(content: bytes) -> RawGame:
+    # One walk over the tree in document order, rows and cells always come
+    # after the group or row they belong to
+    root = lxml_html.fromstring(content)
+    game = RawGame()
+    group = None
+    row = None
+    for element in root.iter():
+        classes = element.get("class")
+        if not classes:
+            continue
+        if classes == name_div_class:
+            game.team_rows.append([
+                _row_label(child) for child in element.iterchildren("div")
+            ][2:])
+            continue
+        for cls in classes.split():
+            if cls == stat_cell_class:
+                if row is not None:
+                    row.append(element.text_content())
+            elif cls == row_class:
+                row = []
+                if group is not None:
+                    group.append(row)
+            elif cls == columns_class:
+                group = []
+                row = None
+                game.stat_groups.append(group)
+            elif cls == player_link:
+                href = element.get("href")
+                game.players.append(
+                    (href, re.match(re_player, href).groups()[0])
+                )
+            elif cls == team_name_class:
+                game.team_names.append(element.text_content().strip())
+            elif cls == game_info_class:
+                game.info_items.append(element.text_content().strip())
+            else:
+                continue
+            break
+
+    # Header rows of a group have no stat cells
+    game.stat_groups = [
+        [row for row in group if row] for group in game.stat_groups
+    ]
+    return game
+
+
+ENGINES = {"bs4": _parse_bs4}
+if lxml_html is not None:
+    ENGINES["lxml"] = _parse_lxml
+DEFAULT_ENGINE = "lxml" if lxml_html is not None else "bs4"
+
+
+def game_info_items(content: bytes) -> list[str]:
+    """Text content of the game info items, like RawGame.info_items, but
+    without parsing the whole page. Only the items are cut out and
+    stripped of their tags, a fraction of the cost of parse_page."""
+    return [
+        html.unescape(re_tag.sub(b"", item).decode(errors="replace")).strip()
+        for item in re_info_item.findall(content)
+    ]
+
+
+def parse_page(content: bytes, engine: str = DEFAULT_ENGINE) -> RawGame:
+    """Extracts players, stat cells, team rows and game info from the raw
+    bytes of a game page
+
+    Args:
+        content (bytes): raw html of the game page
+        engine (str): "lxml" (single pass, default if installed) or "bs4"
+
+    Returns:
+        RawGame: the extracted page contents
+    """
+    try:
+        parser = ENGINES[engine]
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser engine {engine}, use one of {list(ENGINES)}"
+        ) from None
+    return parser(content)
+
+
+def box_score_cells(game: RawGame) -> dict[str, list] | None:
+    """Flattens the box score of a parsed page into long format, one entry
+    per row and stat with the cell text as value. The game info becomes
+    stats of every row as well, so a batch of games can be pivoted and cast
+    in one go by CellBuffer. The Team row only holds team rebounds and
+    turnovers that are part of the totals anyway, it is left out.
+
+    Args:
+        game (RawGame): output of parse_page
+
+    Returns:
+        dict[str, list] | None: row, stat and value lists, None if the page
+        has no box score (yet)
+    """
+    if not game.stat_groups:
+        return None
+    home, away = game.team_names[:2]
+    info = game.info_items
+    round, date, time = info[0], info[1], info[3]
+    teams = [(home, away, "true"), (away, home, "false")]
+
+    cells = {"row": [], "stat": [], "value": []}
+    row = 0
+    players = [slug for _, slug in game.players]
+    for t, labels in enumerate(game.team_rows[:2]):
+        groups = game.stat_groups[
+            t * GROUPS_PER_TEAM:(t + 1) * GROUPS_PER_TEAM
+        ]
+        # Player rows are followed by an optional Team row and the Total
+        has_team_row = len(labels) >= 2 and labels[-2] == "Team"
+        player_count = len(labels) - (2 if has_team_row else 1)
+        names = players[:player_count] + labels[player_count:]
+        players = players[player_count:]
+        for i, name in enumerate(names):
+            if name == "Team":
+                continue
+            values = [name, *teams[t], date, round, time]
+            values.extend(cell for group in groups for cell in group[i])
+            cells["row"].extend([row] * len(CELL_STATS))
+            cells["stat"].extend(CELL_STATS)
+            cells["value"].extend(values)
+            row += 1
+    return cells
+
+
+def _made_attempted(stat: str, made: str, attempted: str) -> list[pl.Expr]:
+    return [
+        pl.col(stat).str.extract(re_made_attempted, 1).alias(made),
+        pl.col(stat).str.extract(re_made_attempted, 2).alias(attempted),
+    ]
+
+
+def _percentage(stat: str) -> pl.Expr:
+    return pl.col(stat).str.extract(re_percentage, 1).cast(pl.Float32) / 100
+
+
+def _count(stat: str) -> pl.Expr:
+    return pl.col(stat).str.strip_chars().cast(pl.Int16, strict=False)
+
+
+class CellBuffer:
+    """Collects the long format cells of many games and turns them into
+    box scores with a single pivot and one set of casts, so the per game
+    cost is only extending a few lists
+    """
+
+    def __init__(self):
+        self.columns = {"game": [], "row": [], "stat": [], "value": []}
+        self.games = 0
+
+    def __len__(self) -> int:
+        return self.games
+
+    def add(self, game: str, cells: dict[str, list]) -> None:
+        """Adds the output of box_score_cells under the key game"""
+        self.columns["game"].extend([game] * len(cells["row"]))
+        for column in ("row", "stat", "value"):
+            self.columns[column].extend(cells[column])
+        self.games += 1
+
+    def box_scores(self) -> pl.DataFrame | None:
+        """Box scores of all added games in BOX_SCORE_SCHEMA, None if no
+        game was added. Cells that don't hold a number become null, an
+        empty plus minus is 0.
+        """
+        if not self.games:
+            return None
+        wide = pl.DataFrame(
+            self.columns,
+            schema={"game": pl.String, "row": pl.UInt16, "stat": pl.String,
+                    "value": pl.String}
+        ).pivot(on="stat", index=["game", "row"], values="value")
+        return (
+            wide
+            .with_columns(
+                Seconds=(
+                    pl.col("Minutes").str.extract(re_minutes, 1)
+                    .cast(pl.UInt16) * 60
+                    + pl.col("Minutes").str.extract(re_minutes, 2)
+                    .cast(pl.UInt16)
+                ),
+                Points=_count("Points"),
+                **{"2P_Percentage": _percentage("2P_Percentage"),
+                   "3P_Percentage": _percentage("3P_Percentage"),
+                   "FTP_Percentage": _percentage("FTP_Percentage")},
+                PlusMinus=pl.when(pl.col("PlusMinus").str.strip_chars() == "")
+                .then(0)
+                .otherwise(_count("PlusMinus")),
+                Home=pl.col("Home") == "true",
+                Date=pl.col("Date").str.to_date("%d %b %Y"),
+                Round=pl.col("Round").str.extract(r"(\d{1,2})", 1),
+            )
+            .with_columns(
+                *_made_attempted("2P_Made/Attempted", "TwoPMakes",
+                                 "TwoPAttempts"),
+                *_made_attempted("3P_Made/Attempted", "ThreePMakes",
+                                 "ThreePAttempts"),
+                *_made_attempted("FTP_Made/Attempted", "FTMakes",
+                                 "FTAttempts"),
+                *[_count(stat) for stat in COUNT_STATS],
+            )
+            .select(*BOX_SCORE_SCHEMA)
+            .cast(BOX_SCORE_SCHEMA)
+        )
@@ -0,0 +1,79 @@
+
+from concurrent.futures import (
+    FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+)
+from typing import Callable, Iterable, Iterator, TypeVar
+import multiprocessing
+import os
+
+T = TypeVar("T")
+
+
+def parser_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """Process pool for parse_pages, can be shared by several seasons"""
+    # Polars is multithreaded, forking it can deadlock
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(workers or os.cpu_count(), mp_context=context)
+
+
+def parse_pages(
+        pages: Iterable[tuple[str, bytes | None]],
+        parse: Callable[[bytes], T],
+        workers: int | None = None,
+        max_pending: int | None = None,
+        pool: Executor | None = None
+) -> Iterator[tuple[str, T]]:
+    """Parses fetched pages in a pool of processes
+
+    Pages are pulled from the iterable only while fewer than max_pending
+    are being parsed or waiting to be consumed. Together with the bounded
+    Fetcher.fetch_all this keeps the memory bound by the queue depth and
+    not by the size of the season. Results are yielded as they complete.
+
+    Args:
+        pages (Iterable[tuple[str, bytes | None]]): link and page content,
+            pages without content are skipped
+        parse (Callable[[bytes], T]): top level function used to parse a page
+        workers (int, optional): amount of processes, all cpus by default,
+            0 parses in the calling process
+        max_pending (int, optional): queue depth, twice workers by default
+        pool (Executor, optional): shared pool to use instead of starting
+            one, it is not shut down afterwards
+
+    Yields:
+        tuple[str, T]: link and the parse result
+    """
+    if pool is None and workers == 0:
+        for link, content in pages:
+            if content is not None:
+                yield link, parse(content)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    if pool is not None:
+        yield from _parse_in_pool(pages, parse, pool, max_pending)
+        return
+    with parser_pool(workers) as pool:
+        yield from _parse_in_pool(pages, parse, pool, max_pending)
+
+
+def _parse_in_pool(
+        pages: Iterable[tuple[str, bytes | None]],
+        parse: Callable[[bytes], T],
+        pool: Executor,
+        max_pending: int
+) -> Iterator[tuple[str, T]]:
+    pending: dict[Future, str] = {}
+    for link, content in pages:
+        if content is None:
+            continue
+        pending[pool.submit(parse, content)] = link
+        while len(pending) >= max_pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
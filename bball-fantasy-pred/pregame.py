@@ -0,0 +1,179 @@
+
+from features import (
+    AVERAGED_STATS, PLAYER_AVERAGED_STATS, PLAYER_FORM_STATS,
+    TEAM_FORM_STATS, add_team_stats, form_features, form_names
+)
+from incremental import PROCESSED_DIR, SeasonState
+from team_stats import load_team_stats
+import polars as pl
+import store
+
+Fixture = tuple[str, str, int]
+
+
+def latest_averages(
+        state: pl.DataFrame, over: str, averaged: dict[str, str]
+) -> pl.DataFrame:
+    """Running averages after the last stored game of every group, the
+    values the next game of the group sees"""
+    return state.select(
+        over,
+        "game_number",
+        *[
+            pl.col(f"sum_{stat}").truediv("game_number").alias(name)
+            for stat, name in averaged.items()
+        ]
+    )
+
+
+def next_form(
+        tail: pl.DataFrame, over: str, columns: list[str]
+) -> pl.DataFrame:
+    """Form features of the next game of every group in the tail
+
+    A placeholder row per group is run through form_features after the
+    tail, the features only look at the games before a row, so they come
+    out exactly as they will for the real game.
+    """
+    placeholders = tail.select(over).unique(maintain_order=True)
+    features, _ = form_features(
+        placeholders.lazy(), over, columns, tail=tail.lazy()
+    )
+    return features.select(over, *form_names(columns)).collect()
+
+
+class PreGameFeatures:
+    """Feature rows in the layout of the features dataset for games that
+    haven't been played yet, from the stored state of a season
+
+    Everything that doesn't depend on the fixtures (averages, form and the
+    roster of every team) is computed once when loading, a slate only
+    costs a few joins of small frames.
+
+    Args:
+        season (str): starting year of the season
+        players (pl.DataFrame): Player, Team of the roster and the player
+            features of the next game
+        teams (pl.DataFrame): Team and the team features of the next game
+        team_stats (pl.DataFrame): advanced team stats of the season
+    """
+
+    def __init__(
+            self,
+            season: str,
+            players: pl.DataFrame,
+            teams: pl.DataFrame,
+            team_stats: pl.DataFrame
+    ):
+        self.season = season
+        self.players = players
+        self.teams = teams
+        self.team_stats = team_stats
+
+    @classmethod
+    def load(
+            cls,
+            season: str,
+            base_dir: str = store.DATASET_DIR,
+            processed_dir: str = PROCESSED_DIR,
+            team_stats: pl.DataFrame | None = None
+    ) -> "PreGameFeatures":
+        """Builds the player and team features from the season state and
+        the rosters from the stored features
+
+        Args:
+            season (str): starting year of the season
+            base_dir (str): root directory of the dataset
+            processed_dir (str): directory of the season states
+            team_stats (pl.DataFrame, optional): advanced team stats of the
+                season, read with load_team_stats if not given
+        """
+        state = SeasonState.load(season, processed_dir)
+        if state.players is None:
+            raise ValueError(f"Season {season} was never processed")
+        if team_stats is None:
+            team_stats = load_team_stats(season)
+
+        # Players count for the team of their last game
+        rosters = (
+            store.scan("features", base_dir)
+            .filter(pl.col("season") == int(season))
+            .select("Player", "Team", "Date")
+            .sort("Date")
+            .group_by("Player")
+            .agg(pl.col("Team").last())
+            .collect()
+        )
+        players = (
+            rosters
+            .join(
+                latest_averages(
+                    state.players, "Player", PLAYER_AVERAGED_STATS
+                ),
+                on="Player"
+            )
+            .join(
+                next_form(state.player_form, "Player", PLAYER_FORM_STATS),
+                on="Player",
+                how="left"
+            )
+        )
+        teams = (
+            latest_averages(state.teams, "Team", AVERAGED_STATS)
+            .drop("game_number")
+            .join(
+                next_form(state.team_form, "Team", TEAM_FORM_STATS),
+                on="Team",
+                how="left"
+            )
+        )
+        return cls(season, players, teams, team_stats)
+
+    def features(self, fixtures: list[Fixture]) -> pl.DataFrame:
+        """Feature rows of every rostered player in the given games
+
+        Args:
+            fixtures (list[Fixture]): (home team, away team, round) of the
+                upcoming games
+
+        Returns:
+            pl.DataFrame: one row per player and game with Team, Opponent,
+            Home, Round and the features under the names of the features
+            dataset. Like in export.training_frames, game_number and the
+            player averages cover the games before the one to predict.
+        """
+        home = [team for team, _, _ in fixtures]
+        away = [opponent for _, opponent, _ in fixtures]
+        rounds = [round for _, _, round in fixtures]
+        sides = pl.DataFrame({
+            "Team": home + away,
+            "Opponent": away + home,
+            "Home": [True] * len(home) + [False] * len(away),
+            "Round": rounds + rounds,
+        }).cast({
+            "Team": pl.Categorical, "Opponent": pl.Categorical,
+            "Round": pl.UInt8
+        })
+        team_features = [name for name in self.teams.columns if name != "Team"]
+        rows = (
+            sides.lazy()
+            .join(self.players.lazy(), on="Team")
+            .join(
+                self.teams.lazy().rename(
+                    {name: f"{name}_own_team" for name in team_features}
+                ),
+                on="Team",
+                how="left"
+            )
+            .join(
+                self.teams.lazy().rename(
+                    {name: f"{name}_opponent" for name in team_features}
+                ),
+                left_on="Opponent",
+                right_on="Team",
+                how="left"
+            )
+        )
+        return add_team_stats(
+            rows, self.team_stats.lazy(), self.season
+        ).collect()
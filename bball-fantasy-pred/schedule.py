@@ -0,0 +1,126 @@
+
+from typing import Iterable, Iterator
+from fetch import Fetcher
+import json
+import re
+
+GAME_CENTER = "/euroleague/game-center/"
+ROUNDS = range(1, 35)
+
+link_format = (
+    r"/euroleague/game-center/\d\d\d\d-\d\d/[\w-]+/E\d\d\d\d/[\d]{1,3}/"
+)
+re_link = re.compile(link_format)
+re_next_data = re.compile(
+    rb'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>',
+    re.DOTALL
+)
+
+
+def round_link(season: str, round: int) -> str:
+    return f"{GAME_CENTER}?round={round}&season=E{season}"
+
+
+def _walk_strings(data) -> Iterator[str]:
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from _walk_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _walk_strings(value)
+
+
+def extract_game_links(content: bytes) -> list[str]:
+    """Takes a game center page and returns all game links in it
+
+    The links are taken from the server rendered markup and from the
+    embedded __NEXT_DATA__ payload, so no browser has to render the page.
+
+    Args:
+        content (bytes): raw html of a game center page
+
+    Returns:
+        list[str]: unique game links in order of appearance
+    """
+    html = content.decode("utf-8", errors="replace")
+    links = re_link.findall(html)
+
+    payload = re_next_data.search(content)
+    if payload is not None:
+        try:
+            data = json.loads(payload.group(1))
+        except ValueError:
+            data = None
+        for value in _walk_strings(data):
+            links.extend(re_link.findall(value))
+
+    return list(dict.fromkeys(links))
+
+
+def discover_rounds(
+        season: str,
+        fetcher: Fetcher,
+        rounds: Iterable[int] = ROUNDS
+) -> dict[int, list[str]]:
+    """Fetches the game center page of every round concurrently and returns
+    the game links of the season found in each of them
+
+    Args:
+        season (str): starting year of the season
+        fetcher (Fetcher): Fetcher to use
+        rounds (Iterable[int]): rounds to look up, all 34 by default
+
+    Raises:
+        RuntimeError: if none of the rounds could be loaded, e.g. the site
+            is down or blocks us
+
+    Returns:
+        dict[int, list[str]]: round -> game links, rounds that failed to
+        load are missing
+    """
+    round_links = {round_link(season, r): r for r in rounds}
+    links_per_round = {}
+    for link, content in fetcher.fetch_all(round_links):
+        if content is None:
+            continue
+        links_per_round[round_links[link]] = [
+            game for game in extract_game_links(content)
+            if f"/E{season}/" in game
+        ]
+    if round_links and not links_per_round:
+        raise RuntimeError(f"No round of season {season} could be loaded")
+    return links_per_round
+
+
+def discover_links(
+        season: str,
+        fetcher: Fetcher | None = None,
+        rounds: Iterable[int] = ROUNDS
+) -> list[str]:
+    """Collects the game links of a season by fetching the game center page
+    of every round concurrently
+
+    Args:
+        season (str): starting year of the season
+        fetcher (Fetcher, optional): Fetcher to use, a new one if not given
+        rounds (Iterable[int]): rounds to look up, all 34 by default
+
+    Returns:
+        list[str]: unique game links of the season
+    """
+    if fetcher is None:
+        with Fetcher() as fetcher:
+            return discover_links(season, fetcher, rounds)
+
+    rounds = list(rounds)
+    links_per_round = discover_rounds(season, fetcher, rounds)
+    missing = [r for r in rounds if not links_per_round.get(r)]
+    if missing:
+        print(f"No games found for rounds {missing} of season {season}")
+
+    links = []
+    for r in rounds:
+        links.extend(links_per_round.get(r, []))
+    return list(dict.fromkeys(links))
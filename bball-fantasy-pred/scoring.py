@@ -0,0 +1,156 @@
+
+from features import FORM_WINDOWS
+import polars as pl
+import store
+
+DOUBLE_DIGIT_STATS = [
+    "Points", "Total_Rebounds", "Assists", "Steals", "Blocks"
+]
+
+
+def _stat(name: str) -> pl.Expr:
+    # Counts are unsigned, misses and negative weights would wrap around
+    return pl.col(name).cast(pl.Float32)
+
+
+def _double_digits() -> pl.Expr:
+    return pl.sum_horizontal(
+        (pl.col(stat) >= 10).cast(pl.UInt8) for stat in DOUBLE_DIGIT_STATS
+    )
+
+
+# Stats the rules can use besides the box score columns
+DERIVED_STATS = {
+    "FGMakes": _stat("TwoPMakes") + _stat("ThreePMakes"),
+    "FGAttempts": _stat("TwoPAttempts") + _stat("ThreePAttempts"),
+    "FGMisses": (
+        _stat("TwoPAttempts") - _stat("TwoPMakes")
+        + _stat("ThreePAttempts") - _stat("ThreePMakes")
+    ),
+    "FTMisses": _stat("FTAttempts") - _stat("FTMakes"),
+    "DoubleDouble": (_double_digits() >= 2).cast(pl.Float32),
+    "TripleDouble": (_double_digits() >= 3).cast(pl.Float32),
+}
+
+# League formats, stat -> points per unit. Adding a format here adds its
+# fp_<name> column and averages.
+SCORING_RULES = {
+    # Performance index rating, the Effectivity column of the box scores
+    "pir": {
+        "Points": 1, "Total_Rebounds": 1, "Assists": 1, "Steals": 1,
+        "Blocks": 1, "FoulReceived": 1, "FGMisses": -1, "FTMisses": -1,
+        "Turnovers": -1, "ReceivedBlocks": -1, "FoulsCommited": -1,
+    },
+    "points_league": {
+        "Points": 1, "ThreePMakes": 1, "FGMakes": 2, "FGAttempts": -1,
+        "FTMakes": 1, "FTAttempts": -1, "Total_Rebounds": 1, "Assists": 2,
+        "Steals": 4, "Blocks": 4, "Turnovers": -2,
+    },
+    "daily": {
+        "Points": 1, "ThreePMakes": 0.5, "Total_Rebounds": 1.25,
+        "Assists": 1.5, "Steals": 2, "Blocks": 2, "Turnovers": -0.5,
+        "DoubleDouble": 1.5, "TripleDouble": 3,
+    },
+}
+
+
+def points_name(rules: str) -> str:
+    return f"fp_{rules}"
+
+
+def scoring_expr(weights: dict[str, float]) -> pl.Expr:
+    """Fantasy points of a rule set as one expression over a box score row
+
+    Args:
+        weights (dict[str, float]): box score column or DERIVED_STATS
+            name -> points per unit
+
+    Returns:
+        pl.Expr: Float32 points
+    """
+    terms = [
+        (DERIVED_STATS[stat] if stat in DERIVED_STATS else _stat(stat))
+        * weight
+        for stat, weight in weights.items()
+    ]
+    return pl.sum_horizontal(terms).cast(pl.Float32)
+
+
+def fantasy_points(
+        box_scores: pl.LazyFrame,
+        rules: dict[str, dict[str, float]] = SCORING_RULES
+) -> pl.LazyFrame:
+    """Adds fp_<name> for every rule set to the player rows, the team
+    Total rows are left out"""
+    return (
+        box_scores
+        .filter(pl.col("Player").ne("Total"))
+        .with_columns(**{
+            points_name(name): scoring_expr(weights)
+            for name, weights in rules.items()
+        })
+    )
+
+
+def fantasy_averages(
+        scored: pl.LazyFrame,
+        names: list[str],
+        windows: list[int] = FORM_WINDOWS,
+        over: list[str] = ["season", "Player"]
+) -> pl.LazyFrame:
+    """Adds running and last-N averages of the fantasy points
+
+    Like the stat features, avg_fp_<name> is the season to date average
+    including the row and last<n>_fp_<name> the mean of the n games before
+    the row.
+
+    Args:
+        scored (pl.LazyFrame): output of fantasy_points
+        names (list[str]): rule sets to average
+        windows (list[int]): sizes of the last-N windows
+        over (list[str]): columns of a group, per player and season by
+            default
+
+    Returns:
+        pl.LazyFrame: scored sorted by date with the average columns
+    """
+    averages = {}
+    for name in names:
+        points = pl.col(points_name(name))
+        averages[f"avg_{points_name(name)}"] = (
+            points.cum_sum().over(over) / points.cum_count().over(over)
+        )
+        for n in windows:
+            averages[f"last{n}_{points_name(name)}"] = (
+                points.shift(1).rolling_mean(n, min_samples=1).over(over)
+            )
+    return scored.sort("Date").with_columns(**averages)
+
+
+def score_dataset(
+        seasons: list[str] | None = None,
+        rules: dict[str, dict[str, float]] = SCORING_RULES,
+        windows: list[int] = FORM_WINDOWS,
+        base_dir: str = store.DATASET_DIR
+) -> pl.DataFrame:
+    """Scores the stored box scores of all seasons with every rule set in
+    one pass
+
+    Args:
+        seasons (list[str], optional): seasons to score, all by default
+        rules (dict): rule sets, SCORING_RULES by default
+        windows (list[int]): sizes of the last-N windows
+        base_dir (str): root directory of the dataset
+
+    Returns:
+        pl.DataFrame: player box scores with the fp_ columns and their
+        averages
+    """
+    box_scores = store.scan("box_scores", base_dir)
+    if seasons is not None:
+        box_scores = box_scores.filter(
+            pl.col("season").is_in([int(s) for s in seasons])
+        )
+    return fantasy_averages(
+        fantasy_points(box_scores, rules), list(rules), windows
+    ).collect()
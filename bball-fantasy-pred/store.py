@@ -0,0 +1,175 @@
+
+from incremental import PROCESSED_DIR, SeasonState
+from os import path
+import polars as pl
+import shutil
+import uuid
+import glob
+import os
+
+DATASET_DIR = path.join(".", "data", "processed", "dataset")
+
+# Partition columns in the directory names, files keep their own Round
+PARTITION_SCHEMA = {"season": pl.Int16, "round": pl.Int16}
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def _partition_dir(kind: str, season: str, round: int, base_dir: str) -> str:
+    return path.join(base_dir, kind, f"season={season}", f"round={round}")
+
+
+def _write_file(
+        df: pl.DataFrame, directory: str, run: str | None = None
+) -> tuple[str, str]:
+    os.makedirs(directory, exist_ok=True)
+    prefix = "part" if run is None else f"part-{run}"
+    name = f"{prefix}-{uuid.uuid4().hex}.parquet"
+    # The temporary name does not end on .parquet, readers skip it
+    tmp_path = path.join(directory, f".{name}.tmp")
+    df.write_parquet(
+        tmp_path, statistics=True, row_group_size=ROW_GROUP_SIZE
+    )
+    return tmp_path, path.join(directory, name)
+
+
+def append(
+        df: pl.DataFrame,
+        kind: str,
+        season: str,
+        base_dir: str = DATASET_DIR,
+        run: str | None = None
+) -> list[str]:
+    """Appends rows of a season to the dataset, one new file per round
+
+    All files are written under temporary names first and only renamed once
+    every partition is written, so readers never see half an append.
+    Rows are sorted by Team and Player inside a file to give the row group
+    statistics something to prune on.
+
+    Args:
+        df (pl.DataFrame): box scores or features with a Round column
+        kind (str): name of the dataset, e.g. box_scores or features
+        season (str): starting year of the season
+        base_dir (str): root directory of all datasets
+        run (str, optional): id that goes into the file names, the files
+            of a run can be removed again with drop_run
+
+    Returns:
+        list[str]: paths of the written files
+    """
+    if df.is_empty():
+        return []
+    written = []
+    try:
+        for (round,), part in df.partition_by(
+            "Round", as_dict=True, maintain_order=True
+        ).items():
+            directory = _partition_dir(kind, season, int(round), base_dir)
+            written.append(
+                _write_file(part.sort("Team", "Player"), directory, run)
+            )
+    except BaseException:
+        for tmp_path, _ in written:
+            os.remove(tmp_path)
+        raise
+    for tmp_path, final_path in written:
+        os.replace(tmp_path, final_path)
+    return [final_path for _, final_path in written]
+
+
+def drop_season(kind: str, season: str, base_dir: str = DATASET_DIR) -> None:
+    """Removes all partitions of a season, e.g. before processing it again"""
+    shutil.rmtree(
+        path.join(base_dir, kind, f"season={season}"), ignore_errors=True
+    )
+
+
+def drop_run(
+        kind: str, season: str, run: str, base_dir: str = DATASET_DIR
+) -> int:
+    """Removes the files an append with the given run id wrote into a
+    season, e.g. of a run that crashed before it saved its state
+
+    Returns:
+        int: amount of removed files
+    """
+    files = glob.glob(path.join(
+        base_dir, kind, f"season={season}", "round=*", f"part-{run}-*.parquet"
+    ))
+    for file in files:
+        os.remove(file)
+    return len(files)
+
+
+def compact(
+        kind: str,
+        base_dir: str = DATASET_DIR,
+        processed_dir: str = PROCESSED_DIR
+) -> int:
+    """Merges the files of every partition into a single file
+
+    The merged file is in place before the old ones get deleted, so a
+    reader running at the same time can see rows twice but never loses
+    any. Partitions with files of a run that is still pending in the
+    state of its season are left alone, drop_run has to find them.
+
+    Args:
+        kind (str): name of the dataset
+        base_dir (str): root directory of all datasets
+        processed_dir (str): directory of the season states
+
+    Returns:
+        int: amount of partitions that got compacted
+    """
+    compacted = 0
+    for season_dir in sorted(glob.glob(path.join(base_dir, kind, "season=*"))):
+        season = path.basename(season_dir).split("=", 1)[1]
+        compacted += _compact_season(
+            season_dir, SeasonState.pending_run(season, processed_dir)
+        )
+    return compacted
+
+
+def _compact_season(season_dir: str, pending: str | None) -> int:
+    compacted = 0
+    for directory in sorted(glob.glob(path.join(season_dir, "round=*"))):
+        files = sorted(glob.glob(path.join(directory, "*.parquet")))
+        if len(files) < 2:
+            continue
+        if pending is not None and any(
+            path.basename(file).startswith(f"part-{pending}-")
+            for file in files
+        ):
+            continue
+        merged = pl.read_parquet(files).sort("Team", "Player")
+        tmp_path, final_path = _write_file(merged, directory)
+        os.replace(tmp_path, final_path)
+        for file in files:
+            os.remove(file)
+        compacted += 1
+    return compacted
+
+
+def scan(kind: str, base_dir: str = DATASET_DIR) -> pl.LazyFrame:
+    """Lazily scans a dataset with the season and round partition columns
+
+    Filters on season and round only open the matching directories, other
+    filters are pushed down to the row group statistics. E.g. a team in the
+    last five rounds of the regular season, in all seasons:
+
+        scan("features").filter(
+            pl.col("round") > 29, pl.col("Team") == team
+        ).collect()
+
+    Args:
+        kind (str): name of the dataset
+        base_dir (str): root directory of all datasets
+
+    Returns:
+        pl.LazyFrame: the whole dataset
+    """
+    return pl.scan_parquet(
+        path.join(base_dir, kind, "**", "*.parquet"),
+        hive_partitioning=True,
+        hive_schema=PARTITION_SCHEMA
+    )
@@ -0,0 +1,154 @@
+
+from features import TEAM_STATS_COLUMNS, season_name
+from os import path
+import polars as pl
+import hashlib
+import glob
+import json
+import sys
+import os
+
+EXTERNAL_DIR = path.join(".", "data", "external")
+CACHE_DIR = path.join(".", "data", "interim", "team_stats")
+
+TEAM_STATS_SCHEMA = {
+    "TEAM": pl.String,
+    **{column: pl.Float64 for column in TEAM_STATS_COLUMNS[1:]}
+}
+
+
+def excel_path(season: str, external_dir: str = EXTERNAL_DIR) -> str:
+    return path.join(external_dir, f"Team stats_{season_name(season)}.xlsx")
+
+
+def cache_path(season: str, cache_dir: str = CACHE_DIR) -> str:
+    return path.join(cache_dir, f"team_stats_{season}.arrow")
+
+
+def _sha256(file: str) -> str:
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_excel(season: str, external_dir: str = EXTERNAL_DIR) -> pl.DataFrame:
+    """Reads the advanced team stats of a season from the external data,
+    percentages of steals and blocks are scaled to 0-1 like the others"""
+    stats_df = pl.read_excel(
+        excel_path(season, external_dir),
+        sheet_name="stats_clean",
+        engine="xlsx2csv"
+    )
+    return (
+        stats_df
+        .filter(pl.col("TEAM").is_not_null())
+        .select(TEAM_STATS_COLUMNS)
+        .with_columns(
+            pl.col("ST%").truediv(100),
+            pl.col("BLK%").truediv(100),
+        )
+        .cast(TEAM_STATS_SCHEMA)
+    )
+
+
+def ingest(
+        season: str,
+        external_dir: str = EXTERNAL_DIR,
+        cache_dir: str = CACHE_DIR
+) -> str:
+    """Converts the Excel file of a season into the cache unless the cache
+    is already up to date
+
+    The cache is valid while the Excel file has the same modification time
+    and size. If those changed, the content hash decides, so copying or
+    touching the file doesn't trigger a conversion.
+
+    Args:
+        season (str): starting year of the season
+        external_dir (str): directory with the Excel files
+        cache_dir (str): directory of the cached Arrow files
+
+    Returns:
+        str: path of the cached Arrow file
+    """
+    source = excel_path(season, external_dir)
+    target = cache_path(season, cache_dir)
+    meta_path = target + ".json"
+    stat = os.stat(source)
+    meta = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    cached = None
+    if path.exists(target) and path.exists(meta_path):
+        with open(meta_path) as f:
+            cached = json.load(f)
+        if all(cached.get(key) == value for key, value in meta.items()):
+            return target
+
+    meta["sha256"] = _sha256(source)
+    if cached is None or cached.get("sha256") != meta["sha256"]:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Uncompressed so it can be memory mapped
+        read_excel(season, external_dir).write_ipc(
+            target + ".tmp", compression="uncompressed"
+        )
+        os.replace(target + ".tmp", target)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return target
+
+
+def load_team_stats(
+        season: str,
+        external_dir: str = EXTERNAL_DIR,
+        cache_dir: str = CACHE_DIR
+) -> pl.DataFrame:
+    """Advanced team stats of a season, memory mapped from the cache which
+    gets refreshed first if the Excel file changed"""
+    # Polars maps uncompressed IPC files instead of reading them
+    return pl.read_ipc(ingest(season, external_dir, cache_dir))
+
+
+def stored_seasons(external_dir: str = EXTERNAL_DIR) -> list[str]:
+    """Seasons that have an Excel file, e.g. 2023 for Team stats_23_24"""
+    seasons = []
+    for file in glob.glob(path.join(external_dir, "Team stats_*_*.xlsx")):
+        start = path.basename(file)[len("Team stats_"):].split("_")[0]
+        if start.isdigit():
+            seasons.append(str(2000 + int(start)))
+    return sorted(seasons)
+
+
+def load_all_team_stats(
+        seasons: list[str] | None = None,
+        external_dir: str = EXTERNAL_DIR,
+        cache_dir: str = CACHE_DIR
+) -> pl.DataFrame:
+    """Team stats of several seasons as one frame with a season column
+
+    Args:
+        seasons (list[str], optional): all seasons with an Excel file by
+            default
+        external_dir (str): directory with the Excel files
+        cache_dir (str): directory of the cached Arrow files
+
+    Returns:
+        pl.DataFrame: TEAM_STATS_COLUMNS and season
+    """
+    if seasons is None:
+        seasons = stored_seasons(external_dir)
+    frames = [
+        load_team_stats(season, external_dir, cache_dir)
+        .with_columns(season=pl.lit(int(season), dtype=pl.Int16))
+        for season in seasons
+    ]
+    if not frames:
+        return pl.DataFrame(schema={**TEAM_STATS_SCHEMA, "season": pl.Int16})
+    return pl.concat(frames)
+
+
+if __name__ == "__main__":
+    for season in sys.argv[1:] or stored_seasons():
+        print(f"{season}: {ingest(season)}")
@@ -0,0 +1,274 @@
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from parsing import (
+    GROUPS_PER_TEAM, RAW_STATS, RawGame, re_made_attempted, re_minutes
+)
+from os import path
+import json
+import os
+import re
+
+QUARANTINE_DIR = path.join(".", "data", "interim", "quarantine")
+
+# Percentages on the page are rounded, a wrong column is off by far more
+PERCENTAGE_TOLERANCE = 0.5
+
+# Pattern every non empty cell of a stat has to match
+_made_attempted = re_made_attempted
+_count = r"\d+"
+_signed = r"[+-]?\d+"
+_percentage = r"[\d.]+%"
+CELL_PATTERNS = {
+    "Minutes": re_minutes,
+    "Points": _count,
+    "2P_Made/Attempted": _made_attempted,
+    "2P_Percentage": _percentage,
+    "3P_Made/Attempted": _made_attempted,
+    "3P_Percentage": _percentage,
+    "FTP_Made/Attempted": _made_attempted,
+    "FTP_Percentage": _percentage,
+    **{stat: _count for stat in RAW_STATS[8:-2]},
+    "Effectivity": _signed,
+    "PlusMinus": _signed,
+}
+# A whole row is checked with a single match, the cells joined by a
+# separator that can't be part of a cell
+_SEPARATOR = "\x1f"
+ROW_PATTERN = re.compile(
+    _SEPARATOR.join(f"(?:{CELL_PATTERNS[stat]})?" for stat in RAW_STATS)
+)
+
+# Numbers whose player and Team rows add up to the Total row, minutes and
+# plus minus are rounded or not additive. Made/attempted cells hold two.
+SUMMED_STATS = [
+    "Points", "2P_Made/Attempted", "3P_Made/Attempted", "FTP_Made/Attempted",
+    *RAW_STATS[8:-2]
+]
+NUMBER_NAMES = [
+    "Points", "TwoPMakes", "TwoPAttempts", "ThreePMakes", "ThreePAttempts",
+    "FTMakes", "FTAttempts", *RAW_STATS[8:-2]
+]
+# Positions in NUMBER_NAMES of made and attempted, with the percentage cell
+SHOTS = [(1, 2, "2P_Percentage"), (3, 4, "3P_Percentage"),
+         (5, 6, "FTP_Percentage")]
+_index = {stat: i for i, stat in enumerate(RAW_STATS)}
+_number_cells = [
+    (_index[stat], "0/0" if "/" in stat else "0") for stat in SUMMED_STATS
+]
+
+
+@dataclass
+class InvalidGame:
+    """Result of parsing a page that failed validation, it carries the raw
+    page so it can be quarantined by the process that stores games
+
+    Attributes:
+        problems: what is wrong with the page, one message each
+        content: raw html of the page
+    """
+    problems: list[str] = field(default_factory=list)
+    content: bytes = b""
+
+
+def _row_numbers(row: list[str]) -> list[int]:
+    """NUMBER_NAMES of a row with valid cells, empty cells count 0"""
+    cells = "/".join(row[i] or empty for i, empty in _number_cells)
+    return list(map(int, cells.split("/")))
+
+
+def _check_row(label: str, row: list[str], numbers: list[int]) -> list[str]:
+    problems = []
+    for made, attempted, percentage in SHOTS:
+        hits, attempts = numbers[made], numbers[attempted]
+        shown = row[_index[percentage]]
+        if hits > attempts:
+            problems.append(f"{label!r} made {hits} of {attempts} shots")
+        elif attempts and shown and abs(
+            float(shown.rstrip("%")) - 100 * hits / attempts
+        ) > PERCENTAGE_TOLERANCE:
+            problems.append(
+                f"{percentage} of {label!r} is {shown} for {hits}/{attempts}"
+            )
+    points = 2 * numbers[1] + 3 * numbers[3] + numbers[5]
+    if numbers[0] != points:
+        problems.append(
+            f"{label!r} has {numbers[0]} points, the shots make {points}"
+        )
+    offensive, defensive, total = numbers[7:10]
+    if offensive + defensive != total:
+        problems.append(
+            f"{label!r} has {total} rebounds from {offensive} offensive and "
+            f"{defensive} defensive"
+        )
+    return problems
+
+
+def check_structure(game: RawGame) -> list[str]:
+    """Checks that the page has the layout box_score_cells relies on: two
+    teams, the game info, GROUPS_PER_TEAM column groups per team with a
+    row per name row, a player link per player row and the Total row last
+
+    Returns:
+        list[str]: problems, empty if the layout is as expected
+    """
+    problems = []
+    if len(game.team_names) != 2:
+        problems.append(f"{len(game.team_names)} team names instead of 2")
+    if len(game.info_items) < 4:
+        problems.append(f"{len(game.info_items)} game info items")
+    else:
+        if not re.search(r"\d{1,2}", game.info_items[0]):
+            problems.append(f"no round in {game.info_items[0]!r}")
+        try:
+            datetime.strptime(game.info_items[1], "%d %b %Y")
+        except ValueError:
+            problems.append(f"no date in {game.info_items[1]!r}")
+    if len(game.team_rows) != 2:
+        problems.append(f"{len(game.team_rows)} name columns instead of 2")
+    if len(game.stat_groups) != 2 * GROUPS_PER_TEAM:
+        problems.append(
+            f"{len(game.stat_groups)} column groups instead of "
+            f"{2 * GROUPS_PER_TEAM}"
+        )
+    if problems:
+        return problems
+
+    player_rows = 0
+    for t, labels in enumerate(game.team_rows):
+        if not labels or labels[-1] != "Total":
+            problems.append(f"team {t} has no Total row")
+            continue
+        if len(labels) < 2:
+            problems.append(f"team {t} has no players")
+            continue
+        players = labels[:-2] if labels[-2] == "Team" else labels[:-1]
+        if "Team" in players or "Total" in players:
+            problems.append(f"team {t} has Team or Total between players")
+        player_rows += len(players)
+        groups = game.stat_groups[
+            t * GROUPS_PER_TEAM:(t + 1) * GROUPS_PER_TEAM
+        ]
+        if any(len(group) != len(labels) for group in groups):
+            problems.append(
+                f"team {t} has {[len(group) for group in groups]} rows in "
+                f"its column groups but {len(labels)} names"
+            )
+            continue
+        for i in range(len(labels)):
+            cells = sum(len(group[i]) for group in groups)
+            if cells != len(RAW_STATS):
+                problems.append(
+                    f"row {labels[i]!r} of team {t} has {cells} cells "
+                    f"instead of {len(RAW_STATS)}"
+                )
+                break
+    if player_rows != len(game.players):
+        problems.append(
+            f"{len(game.players)} player links for {player_rows} player rows"
+        )
+    return problems
+
+
+def check_values(game: RawGame) -> list[str]:
+    """Checks the cells of a page with a valid structure: every cell has
+    the format of its stat, made and percentage cells agree, points and
+    rebounds add up and the rows of a team sum to its Total row
+
+    Returns:
+        list[str]: problems, empty if all values are consistent
+    """
+    problems = []
+    for t, labels in enumerate(game.team_rows):
+        groups = game.stat_groups[
+            t * GROUPS_PER_TEAM:(t + 1) * GROUPS_PER_TEAM
+        ]
+        rows = [
+            [cell.strip() for group in groups for cell in group[i]]
+            for i in range(len(labels))
+        ]
+        malformed = [
+            f"{stat} of {label!r} is {cell!r}"
+            for label, row in zip(labels, rows)
+            if not ROW_PATTERN.fullmatch(_SEPARATOR.join(row))
+            for stat, cell in zip(RAW_STATS, row)
+            if cell and not re.fullmatch(CELL_PATTERNS[stat], cell)
+        ]
+        if malformed:
+            problems += malformed
+            continue
+
+        numbers = [_row_numbers(row) for row in rows]
+        for label, row, row_numbers in zip(labels, rows, numbers):
+            problems += _check_row(label, row, row_numbers)
+        summed = [sum(column) for column in zip(*numbers[:-1])]
+        for name, value, total in zip(NUMBER_NAMES, summed, numbers[-1]):
+            if value != total:
+                problems.append(
+                    f"{name} of team {t} sums to {value}, Total is {total}"
+                )
+    return problems
+
+
+def check_unplayed(game: RawGame, today: date | None = None) -> list[str]:
+    """Checks a page without a box score, that is only expected before the
+    game. A page without game info or with a past date has lost its box
+    score to a markup change."""
+    if len(game.team_names) != 2 or len(game.info_items) < 2:
+        return ["no box score and no game info"]
+    try:
+        day = datetime.strptime(game.info_items[1], "%d %b %Y").date()
+    except ValueError:
+        return [f"no box score and no date in {game.info_items[1]!r}"]
+    if day < (today or date.today()):
+        return [f"no box score although the game was on {day}"]
+    return []
+
+
+def validate_game(game: RawGame) -> list[str]:
+    """All checks of a parsed page, the value checks only run if the
+    structure is valid
+
+    Args:
+        game (RawGame): output of parsing.parse_page
+
+    Returns:
+        list[str]: problems, empty if the page can be stored
+    """
+    if not game.stat_groups:
+        return check_unplayed(game)
+    return check_structure(game) or check_values(game)
+
+
+class Quarantine:
+    """Raw pages of a season that failed validation, next to a JSON file
+    with the link and the problems, for looking at the markup later
+
+    Args:
+        season (str): starting year of the season
+        base_dir (str): directory with one subdirectory per season
+    """
+
+    def __init__(self, season: str, base_dir: str = QUARANTINE_DIR):
+        self.directory = path.join(base_dir, season)
+
+    def path(self, code: str) -> str:
+        return path.join(self.directory, f"{code}.html")
+
+    def __contains__(self, code: str) -> bool:
+        return path.exists(self.path(code))
+
+    def save(self, code: str, link: str, invalid: InvalidGame) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(code), "wb") as f:
+            f.write(invalid.content)
+        with open(path.join(self.directory, f"{code}.json"), "w") as f:
+            json.dump(
+                {
+                    "link": link,
+                    "problems": invalid.problems,
+                    "time": datetime.now(timezone.utc).isoformat(),
+                },
+                f,
+                indent=2
+            )
@@ -0,0 +1,63 @@
+
+"""Compares the parser engines on the fixture game pages
+
+    python benchmarks/bench_parser.py [repeats]
+"""
+from os import path
+import timeit
+import sys
+
+HERE = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(HERE, "..", "bball-fantasy-pred"))
+
+from fixtures import game_pages  # noqa: E402
+from parsing import ENGINES, CellBuffer, parse_page  # noqa: E402
+from get_season_data import parse_game_cells, parse_game_data  # noqa: E402
+
+
+def parse_batch(pages: list[bytes], engine: str):
+    cells = CellBuffer()
+    for i, page in enumerate(pages):
+        cells.add(str(i), parse_game_cells(page, engine))
+    return cells.box_scores()
+
+
+def bench(repeats: int = 5) -> dict[str, dict[str, float]]:
+    pages = game_pages()
+    if not pages:
+        raise SystemExit("No fixture pages, run fixtures.py generate first")
+
+    results = {}
+    for engine in ENGINES:
+        extract = min(timeit.repeat(
+            lambda: [parse_page(page, engine) for page in pages],
+            number=1, repeat=repeats
+        ))
+        full = min(timeit.repeat(
+            lambda: [parse_game_data(page, engine) for page in pages],
+            number=1, repeat=repeats
+        ))
+        batch = min(timeit.repeat(
+            lambda: parse_batch(pages, engine), number=1, repeat=repeats
+        ))
+        results[engine] = {
+            "extract_ms_per_game": extract / len(pages) * 1000,
+            "parse_game_data_ms_per_game": full / len(pages) * 1000,
+            "batch_ms_per_game": batch / len(pages) * 1000
+        }
+    return results
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = bench(repeats)
+    print(
+        f"{'engine':<8}{'extract ms/game':>18}"
+        f"{'parse_game_data ms/game':>26}{'batch ms/game':>16}"
+    )
+    for engine, result in results.items():
+        print(
+            f"{engine:<8}{result['extract_ms_per_game']:>18.2f}"
+            f"{result['parse_game_data_ms_per_game']:>26.2f}"
+            f"{result['batch_ms_per_game']:>16.2f}"
+        )
@@ -0,0 +1,219 @@
+
+"""Times the whole pipeline, fetch to write, on the fixture pages served by
+the stub site and compares the result with a stored baseline
+
+    python benchmarks/bench_pipeline.py [--rounds N] [--repeat N]
+        [--parse-workers N] [--latency S] [--save-baseline]
+
+Stages are timed one after the other: fetch (round discovery and game
+pages over HTTP), parse (page to stat cells), reshape (cells to box
+scores), features and write (appending to a temporary dataset). The best
+run of --repeat counts. A stage that takes more than --tolerance longer
+than in the baseline is reported as a regression and the exit code is 1.
+The baseline is machine specific, save a new one with --save-baseline
+after a change that is expected to alter the timings.
+"""
+from os import path
+import argparse
+import tempfile
+import json
+import time
+import sys
+
+HERE = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(HERE, "..", "bball-fantasy-pred"))
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from fixtures import FIXTURE_DIR, generate, team_stats  # noqa: E402
+from stub_server import StubSite  # noqa: E402
+from fetch import Fetcher  # noqa: E402
+from schedule import discover_rounds  # noqa: E402
+from pipeline import parse_pages  # noqa: E402
+from parsing import CellBuffer  # noqa: E402
+from incremental import SeasonState, game_code  # noqa: E402
+from features import prepare_box_scores  # noqa: E402
+from get_season_data import build_features, parse_game_cells  # noqa: E402
+import store  # noqa: E402
+
+BASELINE_PATH = path.join(HERE, "baseline.json")
+STAGES = ["fetch", "parse", "reshape", "features", "write"]
+SEASON = "2023"
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident memory of this process and its finished children"""
+    if resource is None:
+        return None
+    peak = sum(
+        resource.getrusage(who).ru_maxrss
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    # kilobytes on linux, bytes on macOS
+    return peak / 1024 ** (2 if sys.platform == "darwin" else 1)
+
+
+def run_once(
+        url: str, rounds: range, parse_workers: int, out_dir: str
+) -> tuple[dict[str, float], int]:
+    timings = {}
+
+    start = time.perf_counter()
+    with Fetcher(url, max_workers=8, rate=1e6, burst=1e6) as fetcher:
+        links_per_round = discover_rounds(SEASON, fetcher, rounds)
+        links = [link for r in rounds for link in links_per_round.get(r, [])]
+        pages = list(fetcher.fetch_all(links))
+    timings["fetch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = list(parse_pages(pages, parse_game_cells, workers=parse_workers))
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cells = CellBuffer()
+    for link, game_cells in parsed:
+        if game_cells is not None:
+            cells.add(game_code(link), game_cells)
+    box_scores = cells.box_scores()
+    timings["reshape"] = time.perf_counter() - start
+    if box_scores is None:
+        raise SystemExit(f"No box scores in the fixture pages of {url}")
+
+    start = time.perf_counter()
+    prepared = prepare_box_scores(box_scores)
+    features = build_features(
+        prepared, SEASON, SeasonState(SEASON), team_stats()
+    )
+    timings["features"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.append(prepared, "box_scores", SEASON, out_dir)
+    store.append(features, "features", SEASON, out_dir)
+    timings["write"] = time.perf_counter() - start
+    return timings, len(cells)
+
+
+def bench(
+        fixture_dir: str = FIXTURE_DIR,
+        repeats: int = 3,
+        parse_workers: int = 0,
+        latency: float = 0.0,
+        rounds: range = range(1, 35)
+) -> dict:
+    """Runs the pipeline repeats times against the stub site
+
+    Returns:
+        dict: best time per stage in seconds, games, games_per_s of the
+        total and peak_rss_mb
+    """
+    best = {}
+    with StubSite(fixture_dir, latency=latency) as site:
+        for _ in range(repeats):
+            with tempfile.TemporaryDirectory() as out_dir:
+                timings, games = run_once(
+                    site.url, rounds, parse_workers, out_dir
+                )
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+    total = sum(best.values())
+    return {
+        "stages": best,
+        "total": total,
+        "games": games,
+        "games_per_s": games / total,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(
+        result: dict, baseline: dict, tolerance: float, min_seconds: float
+) -> list[str]:
+    """Stages that got slower than the baseline by more than tolerance,
+    differences below min_seconds are noise and never count"""
+    regressions = []
+    for stage in STAGES:
+        now = result["stages"][stage]
+        before = baseline["stages"].get(stage)
+        if before is None:
+            continue
+        if now > before * (1 + tolerance) and now - before > min_seconds:
+            regressions.append(stage)
+    return regressions
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    print(f"{result['games']} games")
+    print(f"{'stage':<10}{'ms':>10}{'baseline ms':>14}{'change':>10}")
+    now = {**result["stages"], "total": result["total"]}
+    before = {}
+    if baseline is not None:
+        before = {**baseline["stages"], "total": baseline["total"]}
+    for stage in [*STAGES, "total"]:
+        line = f"{stage:<10}{now[stage] * 1000:>10.1f}"
+        if before.get(stage):
+            change = now[stage] / before[stage] - 1
+            line += f"{before[stage] * 1000:>14.1f}{change:>+10.0%}"
+        print(line)
+    print(f"{result['games_per_s']:.1f} games/s")
+    if result["peak_rss_mb"] is not None:
+        print(f"peak RSS {result['peak_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--rounds", type=int, default=None,
+        help="benchmark a synthetic season of that many rounds instead of "
+             "the checked in pages"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--parse-workers", type=int, default=0,
+        help="parser processes, 0 parses in this process"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0,
+        help="seconds the stub site waits before every response"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.005,
+        help="slowdowns below this never count as regression"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        fixture_dir = FIXTURE_DIR
+        if args.rounds is not None:
+            generate(synthetic_dir, SEASON, args.rounds)
+            fixture_dir = synthetic_dir
+        result = bench(
+            fixture_dir, args.repeat, args.parse_workers, args.latency
+        )
+    result["rounds"] = args.rounds
+
+    baseline = None
+    if path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("rounds") != args.rounds:
+            print("Baseline was taken on other fixtures, not comparing")
+            baseline = None
+    print_report(result, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(
+            result, baseline, args.tolerance, args.min_seconds
+        )
+        if regressions:
+            print(f"Regressions in {', '.join(regressions)}")
+            sys.exit(1)
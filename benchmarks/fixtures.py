@@ -0,0 +1,279 @@
+
+"""Fixture pages for the benchmarks
+
+The checked in pages under fixtures/ are generated with the same markup the
+euroleague site uses for game pages. Real pages can be recorded into the
+same layout with
+
+    python benchmarks/fixtures.py record 2023 /euroleague/game-center/...
+
+or whole rounds, game center page included, with
+
+    python benchmarks/fixtures.py record-rounds 2023 1 2
+
+and synthetic ones regenerated with
+
+    python benchmarks/fixtures.py generate
+"""
+from datetime import date, timedelta
+from os import path
+import polars as pl
+import random
+import glob
+import sys
+import os
+
+HERE = path.dirname(path.abspath(__file__))
+FIXTURE_DIR = path.join(HERE, "fixtures")
+sys.path.insert(0, path.join(HERE, "..", "bball-fantasy-pred"))
+
+from parsing import (  # noqa: E402
+    columns_class, row_class, stat_cell_class, player_link, name_div_class,
+    team_name_class, game_info_class
+)
+from features import TEAM_STATS_COLUMNS  # noqa: E402
+
+TEAMS = [
+    "Alpha Madrid", "Beta Athens", "Gamma Milan", "Delta Istanbul",
+    "Epsilon Belgrade", "Zeta Munich"
+]
+GROUPS = [
+    ["MIN", "PTS"], ["2P", "2P%"], ["3P", "3P%"], ["FT", "FT%"],
+    ["O", "D", "T"], ["AS", "ST", "TO"], ["FV", "AG"], ["CM", "RV"],
+    ["PIR", "+/-"]
+]
+SEASON_START = date(2023, 10, 1)
+
+
+def _pct(made: int, attempted: int) -> str:
+    return f"{round(100 * made / attempted, 1)}%" if attempted else "0%"
+
+
+def _player_row(rng: random.Random) -> list[str]:
+    shots = []
+    for _ in range(3):
+        attempts = rng.randint(0, 10)
+        shots.append((rng.randint(0, attempts), attempts))
+    (m2, a2), (m3, a3), (mf, af) = shots
+    o_reb, d_reb = rng.randint(0, 5), rng.randint(0, 8)
+    return [
+        f"{rng.randint(0, 35):02d}:{rng.randint(0, 59):02d}",
+        str(2 * m2 + 3 * m3 + mf),
+        f"{m2}/{a2}", _pct(m2, a2), f"{m3}/{a3}", _pct(m3, a3),
+        f"{mf}/{af}", _pct(mf, af),
+        str(o_reb), str(d_reb), str(o_reb + d_reb),
+        str(rng.randint(0, 8)), str(rng.randint(0, 4)), str(rng.randint(0, 5)),
+        str(rng.randint(0, 3)), str(rng.randint(0, 3)),
+        str(rng.randint(0, 5)), str(rng.randint(0, 5)),
+        str(rng.randint(-5, 30)),
+        rng.choice(["", str(rng.randint(-20, 20))])
+    ]
+
+
+def _total_row(rows: list[list[str]]) -> list[str]:
+    total = []
+    for i in range(20):
+        values = [row[i] for row in rows]
+        if i == 0:
+            seconds = sum(
+                int(v.split(":")[0]) * 60 + int(v.split(":")[1])
+                for v in values
+            )
+            total.append(f"{seconds // 60}:{seconds % 60:02d}")
+        elif i in (2, 4, 6):
+            made = sum(int(v.split("/")[0]) for v in values)
+            attempted = sum(int(v.split("/")[1]) for v in values)
+            total.append(f"{made}/{attempted}")
+        elif i in (3, 5, 7):
+            made, attempted = map(int, total[i - 1].split("/"))
+            total.append(_pct(made, attempted))
+        else:
+            total.append(str(sum(int(v or 0) for v in values)))
+    return total
+
+
+def _team_html(
+        rng: random.Random, team: str, team_row: bool
+) -> tuple[str, str]:
+    slug = team.lower().replace(" ", "-")
+    players = [
+        (f"/euroleague/players/{slug}-player-{i}/P{1000 + i}/",
+         f"{team} Player {i}")
+        for i in range(rng.randint(9, 12))
+    ]
+    rows = [_player_row(rng) for _ in players]
+    total = _total_row(rows)
+    if team_row:
+        # Team rebounds and turnovers are only counted in the totals
+        rows.append(["", "0", "0/0", "0%", "0/0", "0%", "0/0", "0%", "1",
+                     "2", "3", "0", "0", "1", "0", "0", "0", "0", "3", ""])
+        for i, value in ((8, 1), (9, 2), (10, 3), (13, 1), (18, 3)):
+            total[i] = str(int(total[i]) + value)
+    rows.append(total)
+
+    names = f'<div class="{name_div_class}"><div>#</div><div>Player</div>'
+    for href, name in players:
+        names += (
+            f'<div><a class="{player_link}" href="{href}"><b>{name}</b></a>'
+            '</div>'
+        )
+    if team_row:
+        names += "<div><b>Team</b></div>"
+    names += "<div><b>Total</b></div></div>"
+
+    columns = ""
+    offset = 0
+    for headings in GROUPS:
+        columns += f'<div class="{columns_class}">'
+        columns += "".join(f"<div>{h}</div>" for h in headings)
+        columns += f'<div class="{row_class}"></div>'
+        for row in rows:
+            cells = row[offset:offset + len(headings)]
+            columns += f'<div class="{row_class}">' + "".join(
+                f'<div class="{stat_cell_class}">{cell}</div>'
+                for cell in cells
+            ) + "</div>"
+        columns += "</div>"
+        offset += len(headings)
+    return names, columns
+
+
+def game_page(seed: int, round: int, home: str, away: str) -> str:
+    """Builds a game page with random, but consistent box scores"""
+    rng = random.Random(seed)
+    home_names, home_columns = _team_html(rng, home, rng.random() < 0.7)
+    away_names, away_columns = _team_html(rng, away, rng.random() < 0.7)
+    day = SEASON_START + timedelta(days=round * 7)
+    game_date = f"{day.day} {day.strftime('%b')} {day.year}"
+    info = "".join(
+        f'<li class="{game_info_class}">{item}</li>'
+        for item in (f"Round {round}", game_date, "Arena", "20:45")
+    )
+    return (
+        "<html><head><title>Game</title></head><body>"
+        f'<h1 class="{team_name_class}">{home}</h1>'
+        f'<h1 class="{team_name_class}">{away}</h1>'
+        f"<ul>{info}</ul>"
+        f"<section>{home_names}{home_columns}</section>"
+        f"<section>{away_names}{away_columns}</section>"
+        "</body></html>"
+    )
+
+
+def game_center_page(season: str, round: int, links: list[str]) -> str:
+    anchors = "".join(f'<a href="{link}">Game</a>' for link in links)
+    return (
+        "<html><body>"
+        f'<div class="game-center-group_groupTitle__5RCk4">Round {round}</div>'
+        f"{anchors}</body></html>"
+    )
+
+
+def schedule(season: str, rounds: int) -> dict[int, list[tuple]]:
+    """Round robin pairings of TEAMS with the game link of every game"""
+    season_name = f"{season}-{int(season[-2:]) + 1}"
+    games = {}
+    code = 0
+    for round in range(1, rounds + 1):
+        order = TEAMS[:1] + TEAMS[1:][round % 5:] + TEAMS[1:][:round % 5]
+        games[round] = []
+        for i in range(len(TEAMS) // 2):
+            code += 1
+            home, away = order[i], order[-1 - i]
+            link = (
+                f"/euroleague/game-center/{season_name}/"
+                f"{home.lower().replace(' ', '-')}-"
+                f"{away.lower().replace(' ', '-')}/E{season}/{code}/"
+            )
+            games[round].append((link, home, away, code))
+    return games
+
+
+def generate(
+        out_dir: str = FIXTURE_DIR, season: str = "2023", rounds: int = 2
+) -> None:
+    """Writes game center and game pages of a synthetic season"""
+    os.makedirs(path.join(out_dir, "games"), exist_ok=True)
+    os.makedirs(path.join(out_dir, "game_center"), exist_ok=True)
+    for round, games in schedule(season, rounds).items():
+        with open(
+            path.join(out_dir, "game_center", f"E{season}_{round}.html"), "w"
+        ) as f:
+            f.write(game_center_page(season, round, [g[0] for g in games]))
+        for link, home, away, code in games:
+            with open(
+                path.join(out_dir, "games", f"E{season}_{code}.html"), "w"
+            ) as f:
+                f.write(game_page(code, round, home, away))
+
+
+def record(season: str, links: list[str], out_dir: str = FIXTURE_DIR) -> None:
+    """Downloads real game pages into the fixture directory"""
+    from fetch import Fetcher
+    os.makedirs(path.join(out_dir, "games"), exist_ok=True)
+    with Fetcher() as fetcher:
+        for link, content in fetcher.fetch_all(links):
+            if content is None:
+                continue
+            code = link.rstrip("/").split("/")[-1]
+            with open(
+                path.join(out_dir, "games", f"E{season}_{code}.html"), "wb"
+            ) as f:
+                f.write(content)
+
+
+def record_rounds(
+        season: str, rounds: list[int], out_dir: str = FIXTURE_DIR
+) -> None:
+    """Downloads the game center pages of rounds and all their games"""
+    from fetch import Fetcher
+    from schedule import extract_game_links, round_link
+    os.makedirs(path.join(out_dir, "game_center"), exist_ok=True)
+    links = []
+    with Fetcher() as fetcher:
+        for round in rounds:
+            content = fetcher.get(round_link(season, round))
+            with open(
+                path.join(out_dir, "game_center", f"E{season}_{round}.html"),
+                "wb"
+            ) as f:
+                f.write(content)
+            links.extend(
+                link for link in extract_game_links(content)
+                if f"/E{season}/" in link
+            )
+    record(season, links, out_dir)
+
+
+def team_stats() -> pl.DataFrame:
+    """Advanced team stats of TEAMS as load_team_stats returns them"""
+    rng = random.Random(0)
+    return pl.DataFrame({
+        "TEAM": TEAMS,
+        **{
+            column: [rng.uniform(0, 100) for _ in TEAMS]
+            for column in TEAM_STATS_COLUMNS[1:]
+        }
+    })
+
+
+def game_pages(fixture_dir: str = FIXTURE_DIR) -> list[bytes]:
+    pages = []
+    for file in sorted(glob.glob(path.join(fixture_dir, "games", "*.html"))):
+        with open(file, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "generate":
+        generate()
+    elif len(sys.argv) >= 4 and sys.argv[1] == "record":
+        record(sys.argv[2], sys.argv[3:])
+    elif len(sys.argv) >= 4 and sys.argv[1] == "record-rounds":
+        record_rounds(sys.argv[2], [int(r) for r in sys.argv[3:]])
+    else:
+        print(
+            "Run with generate, record <season> <links...> or "
+            "record-rounds <season> <rounds...>"
+        )
@@ -0,0 +1,161 @@
+
+"""Local stand-in for the euroleague site that serves a fixture directory
+
+    python benchmarks/stub_server.py [port] [fixture_dir]
+
+Game center pages are looked up by round and season in game_center/, game
+pages by the game code at the end of their link in games/. Rounds without a
+page get an empty game center page, everything else is a 404. Every page
+has an ETag and a matching If-None-Match gets a 304.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from os import path
+import threading
+import hashlib
+import time
+import sys
+import re
+
+from fixtures import FIXTURE_DIR, game_center_page
+
+re_game = re.compile(r"/E(\d{4})/(\d+)/?$")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections of a concurrent fetcher,
+    # the client only retries them a second later
+    request_queue_size = 128
+
+
+class StubSite:
+    """Serves fixture_dir on localhost in a background thread
+
+    Args:
+        fixture_dir (str): directory with game_center/ and games/
+        port (int): port to listen on, a free one by default
+        latency (float): seconds every response is delayed, to mimic the
+            round trip to the real site
+    """
+
+    def __init__(
+            self,
+            fixture_dir: str = FIXTURE_DIR,
+            port: int = 0,
+            latency: float = 0.0
+    ):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.requests = 0
+        self.failures: dict[str, list[tuple[int, dict]]] = {}
+        self.server = _Server(("127.0.0.1", port), self._handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def fail(
+            self,
+            url: str,
+            status: int,
+            times: int = 1,
+            headers: dict | None = None
+    ) -> None:
+        """Answers the next times requests of url (path and query) with
+        status instead of the page, e.g. to test retries"""
+        self.failures.setdefault(url, []).extend(
+            [(status, headers or {})] * times
+        )
+
+    def page(self, url: str) -> bytes | None:
+        """Content served for a path and query, None for a 404"""
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        if parsed.path.rstrip("/").endswith("game-center") and query:
+            season = query["season"][0].lstrip("E")
+            round = int(query["round"][0])
+            file = path.join(
+                self.fixture_dir, "game_center", f"E{season}_{round}.html"
+            )
+            if not path.exists(file):
+                return game_center_page(season, round, []).encode()
+        else:
+            match = re_game.search(parsed.path)
+            if match is None:
+                return None
+            file = path.join(
+                self.fixture_dir, "games", f"E{match[1]}_{match[2]}.html"
+            )
+            if not path.exists(file):
+                return None
+        with open(file, "rb") as f:
+            return f.read()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                if site.failures.get(self.path):
+                    status, headers = site.failures[self.path].pop(0)
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = site.page(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubSite":
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    fixture_dir = sys.argv[2] if len(sys.argv) > 2 else FIXTURE_DIR
+    site = StubSite(fixture_dir, port)
+    print(f"Serving {fixture_dir} on {site.url}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        site.server.server_close()
@@ -0,0 +1,7 @@
+
+from os import path
+import sys
+
+HERE = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(HERE, "..", "bball-fantasy-pred"))
+sys.path.insert(0, path.join(HERE, "..", "benchmarks"))
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from fixtures import generate
+from stub_server import StubSite
+from cache import ResponseCache
+from fetch import Fetcher
+from metrics import Metrics
+import cache
+
+LINK = "/euroleague/game-center/2023-24/a-b/E2023/1/"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def site(tmp_path):
+    generate(str(tmp_path), "2023", 1)
+    with StubSite(str(tmp_path)) as site:
+        yield site
+
+
+def cached_fetcher(site: StubSite, ttl: float, **kwargs) -> Fetcher:
+    return Fetcher(
+        site.url, rate=1e6, burst=1e6, metrics=Metrics(),
+        cache=ResponseCache(":memory:", ttl=ttl), **kwargs
+    )
+
+
+def lookups(f: Fetcher) -> dict[str, float]:
+    return {
+        result: f.metrics.counter("cache_lookups_total", result=result)
+        for result in ("hit", "miss", "revalidated")
+    }
+
+
+def test_fresh_entries_are_served_without_a_request(site):
+    with cached_fetcher(site, ttl=3600) as f:
+        assert f.get(LINK) == f.get(LINK)
+        assert lookups(f) == {"hit": 1, "miss": 1, "revalidated": 0}
+    assert site.requests == 1
+
+
+def test_stale_entries_are_revalidated_with_the_etag(site):
+    with cached_fetcher(site, ttl=0) as f:
+        first = f.get(LINK)
+        assert f.cache.get(f.url(LINK)).etag is not None
+        assert f.get(LINK) == first
+        assert lookups(f) == {"hit": 0, "miss": 1, "revalidated": 1}
+    assert site.requests == 2
+
+
+def test_final_pages_never_expire(site):
+    with cached_fetcher(site, ttl=0, is_final=lambda content: True) as f:
+        f.get(LINK)
+        f.get(LINK)
+        assert lookups(f)["hit"] == 1
+    assert site.requests == 1
+
+
+def test_forget_drops_the_entry(site):
+    with cached_fetcher(site, ttl=3600) as f:
+        f.get(LINK)
+        f.forget(LINK)
+        f.get(LINK)
+        assert lookups(f)["miss"] == 2
+
+
+def test_ttl(clock):
+    responses = ResponseCache(":memory:", ttl=10)
+    responses.put("a", b"body")
+    assert responses.get("a").is_fresh(responses.ttl)
+    clock.now += 10
+    assert not responses.get("a").is_fresh(responses.ttl)
+
+
+def test_evicts_least_recently_used(clock):
+    # Random bodies don't compress, each entry takes about 1000 bytes
+    responses = ResponseCache(":memory:", max_bytes=2500)
+    responses.put("a", os.urandom(1000))
+    responses.put("b", os.urandom(1000))
+    responses.get("a")
+    responses.put("c", os.urandom(1000))
+    assert responses.get("b") is None
+    assert responses.get("a") is not None
+    assert responses.get("c") is not None
@@ -0,0 +1,82 @@
+from email.utils import formatdate
+import time
+
+import pytest
+import requests
+
+from fixtures import generate
+from stub_server import StubSite
+from fetch import Fetcher, _retry_after
+from metrics import Metrics
+import fetch
+
+LINK = "/euroleague/game-center/2023-24/a-b/E2023/1/"
+
+
+@pytest.fixture
+def site(tmp_path):
+    generate(str(tmp_path), "2023", 1)
+    with StubSite(str(tmp_path)) as site:
+        yield site
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Delays the fetcher waits for, without waiting"""
+    delays = []
+    monkeypatch.setattr(fetch.time, "sleep", delays.append)
+    return delays
+
+
+def fetcher(site: StubSite, **kwargs) -> Fetcher:
+    return Fetcher(
+        site.url, rate=1e6, burst=1e6, backoff=1.0, metrics=Metrics(),
+        **kwargs
+    )
+
+
+def test_retries_server_errors_with_backoff(site, sleeps):
+    site.fail(LINK, 503, times=2)
+    with fetcher(site, max_retries=2) as f:
+        assert b"Alpha Madrid" in f.get(LINK)
+        assert f.metrics.counter("http_retries_total") == 2
+    assert site.requests == 3
+    # Exponential backoff with up to half of the delay as jitter
+    assert 1.0 <= sleeps[0] <= 1.5 and 2.0 <= sleeps[1] <= 3.0
+
+
+def test_honours_retry_after(site, sleeps):
+    site.fail(LINK, 429, headers={"Retry-After": "7"})
+    with fetcher(site) as f:
+        f.get(LINK)
+    assert sleeps == [7.0]
+
+
+def test_retry_after_date():
+    response = requests.Response()
+    response.headers["Retry-After"] = formatdate(time.time() + 60)
+    assert 55 <= _retry_after(response) <= 60
+    response.headers["Retry-After"] = "soon"
+    assert _retry_after(response) is None
+
+
+def test_gives_up_after_max_retries(site, sleeps):
+    site.fail(LINK, 503, times=3)
+    with fetcher(site, max_retries=2) as f:
+        assert list(f.fetch_all([LINK])) == [(LINK, None)]
+        assert f.metrics.counter("fetch_failures_total") == 1
+    assert site.requests == 3
+
+
+def test_not_found_is_not_retried(site, sleeps):
+    missing = LINK.replace("/1/", "/99/")
+    with fetcher(site) as f:
+        assert list(f.fetch_all([missing, LINK]))[0] == (missing, None)
+        assert f.metrics.counter("http_requests_total", status=404) == 1
+    assert site.requests == 2 and sleeps == []
+
+
+def test_fetch_all_keeps_the_order_of_the_links(site):
+    links = [LINK, LINK.replace("/1/", "/99/"), LINK.replace("/1/", "/2/")]
+    with fetcher(site) as f:
+        assert [link for link, _ in f.fetch_all(links)] == links
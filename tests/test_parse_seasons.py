@@ -0,0 +1,20 @@
+import pytest
+
+from get_season_data import parse_seasons
+
+
+def test_years_and_ranges():
+    assert parse_seasons(["2018-2020", "2019", "2022"]) == [
+        "2018", "2019", "2020", "2022"
+    ]
+
+
+def test_season_name_is_its_starting_year():
+    assert parse_seasons(["2023-24"]) == ["2023"]
+    assert parse_seasons(["1999-00"]) == ["1999"]
+
+
+@pytest.mark.parametrize("value", ["2023-2021", "2023-25", "2023-20", "x"])
+def test_invalid_values_raise(value):
+    with pytest.raises(ValueError):
+        parse_seasons([value])
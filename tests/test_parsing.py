@@ -0,0 +1,27 @@
+import pytest
+
+from fixtures import game_page
+from parsing import ENGINES, game_info_items, game_info_class, parse_page
+from get_season_data import is_final_game
+
+PAGE = game_page(1, 1, "Alpha Madrid", "Beta Athens").encode()
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_game_info_items_like_the_parser(engine):
+    assert game_info_items(PAGE) == parse_page(PAGE, engine).info_items
+
+
+def test_game_info_items_with_nested_markup():
+    page = PAGE.replace(
+        f'class="{game_info_class}">'.encode(),
+        f'class="other {game_info_class}"><span>'.encode()
+    ).replace(b"</li>", b"</span></li>")
+    assert game_info_items(page) == parse_page(page).info_items
+    assert is_final_game(page)
+
+
+def test_is_final_game_needs_a_box_score():
+    assert is_final_game(PAGE)
+    page = PAGE.replace(b"tableGroupedColumnStatGroupContainer", b"x")
+    assert not is_final_game(page)
@@ -0,0 +1,27 @@
+import pytest
+
+from fixtures import generate
+from stub_server import StubSite
+from fetch import Fetcher
+from schedule import discover_rounds
+
+
+def fetcher(url: str) -> Fetcher:
+    return Fetcher(url, rate=1e6, burst=1e6, max_retries=0, timeout=5)
+
+
+def test_discover_rounds(tmp_path):
+    generate(str(tmp_path), "2023", 2)
+    with StubSite(str(tmp_path)) as site, fetcher(site.url) as f:
+        links = discover_rounds("2023", f, [1, 2, 3])
+    assert sorted(links) == [1, 2, 3]
+    assert len(links[1]) == len(links[2]) == 3
+    assert links[3] == []
+
+
+def test_discover_rounds_raises_if_no_round_loads(tmp_path):
+    with StubSite(str(tmp_path)) as site:
+        url = site.url
+    # Nothing listens on the port anymore
+    with fetcher(url) as f, pytest.raises(RuntimeError):
+        discover_rounds("2023", f, [1, 2])
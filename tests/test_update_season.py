@@ -0,0 +1,140 @@
+"""Regression tests for the incremental update of a season, run against
+the stub site with synthetic fixture pages
+
+    python -m pytest tests
+"""
+from polars.testing import assert_frame_equal
+import polars as pl
+import pytest
+import shutil
+
+from fixtures import generate, team_stats
+from stub_server import StubSite
+from fetch import Fetcher
+from export import LAGGED_COLUMNS
+from incremental import SeasonState
+from pregame import PreGameFeatures
+import get_season_data
+import store
+
+SEASON = "2023"
+ROUNDS = 4
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Stub site with all rounds, fixture_dir can be pointed to the pages
+    of the first rounds only. Runs in an empty working directory, the
+    dataset and the states are stored relative to it."""
+    for rounds in (ROUNDS - 1, ROUNDS):
+        generate(str(tmp_path / f"rounds_{rounds}"), SEASON, rounds)
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)
+    monkeypatch.setattr(
+        get_season_data, "load_team_stats", lambda season: team_stats()
+    )
+    with StubSite(str(tmp_path / f"rounds_{ROUNDS}")) as site:
+        site.rounds_dir = lambda rounds: str(tmp_path / f"rounds_{rounds}")
+        yield site
+
+
+def update(site: StubSite, full: bool = False) -> None:
+    with Fetcher(site.url, max_workers=8, rate=1e6, burst=1e6) as fetcher:
+        get_season_data.update_season(
+            SEASON, full=full, fetcher=fetcher, parse_workers=0
+        )
+
+
+def stored_features() -> pl.DataFrame:
+    return get_season_data.load_season(SEASON).sort("Player", "Date")
+
+
+def test_two_passes_equal_one_pass(site):
+    site.fixture_dir = site.rounds_dir(ROUNDS - 1)
+    update(site)
+    site.fixture_dir = site.rounds_dir(ROUNDS)
+    update(site)
+    two_passes = stored_features()
+
+    update(site, full=True)
+    one_pass = stored_features()
+
+    assert two_passes.height == one_pass.height
+    assert_frame_equal(two_passes, one_pass, rel_tol=1e-6)
+
+
+def test_rerun_after_crash_appends_once(site, monkeypatch, tmp_path):
+    # The first pass misses the last game, so the crashed run appends to a
+    # round that has a file already and compact would merge the two
+    partial_dir = tmp_path / "partial"
+    shutil.copytree(site.rounds_dir(ROUNDS), partial_dir)
+    last_game = max(
+        (partial_dir / "games").iterdir(),
+        key=lambda file: int(file.stem.split("_")[1])
+    )
+    last_game.unlink()
+    site.fixture_dir = str(partial_dir)
+    update(site)
+    site.fixture_dir = site.rounds_dir(ROUNDS)
+
+    def crash(self, *args, **kwargs):
+        raise RuntimeError("crash before the state is saved")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(SeasonState, "save", crash)
+        with pytest.raises(RuntimeError):
+            update(site)
+    # Compacting must not hide the files of the crashed run
+    for kind in ("box_scores", "features"):
+        store.compact(kind)
+    update(site)
+    after_crash = stored_features()
+
+    update(site, full=True)
+    assert after_crash.select("Player", "Date").is_duplicated().sum() == 0
+    assert_frame_equal(after_crash, stored_features(), rel_tol=1e-6)
+
+
+def test_pregame_equals_stored_features(site):
+    site.fixture_dir = site.rounds_dir(ROUNDS - 1)
+    update(site)
+    pregame = PreGameFeatures.load(SEASON, team_stats=team_stats())
+
+    site.fixture_dir = site.rounds_dir(ROUNDS)
+    update(site)
+    stored = stored_features()
+    last_round = stored.filter(pl.col("Round") == ROUNDS)
+    fixtures = [
+        (str(team), str(opponent), ROUNDS)
+        for team, opponent in last_round.filter(pl.col("Home"))
+        .select("Team", "Opponent").unique().rows()
+    ]
+    predicted = pregame.features(fixtures)
+
+    # What a model is trained on: the lagged columns of the game before
+    lagged = [column for column in LAGGED_COLUMNS if column in stored]
+    expected = (
+        stored.sort("Date")
+        .with_columns(pl.col(lagged).shift(1).over("Player"))
+        .filter(pl.col("Round") == ROUNDS)
+    )
+    columns = [
+        column for column in predicted.columns
+        if column in expected.columns
+    ]
+    # Players in their first game have no state to predict from
+    players = predicted.select("Player").join(
+        expected.select("Player"), on="Player"
+    )
+    expected = expected.select(columns).join(
+        players, on="Player", how="semi"
+    ).sort("Player")
+    predicted = predicted.select(columns).join(
+        players, on="Player", how="semi"
+    ).sort("Player")
+
+    assert predicted.height == expected.height > 0
+    assert_frame_equal(
+        predicted, expected, rel_tol=1e-5, check_dtypes=False
+    )
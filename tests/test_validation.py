@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+import json
+
+import pytest
+
+from fixtures import game_page
+from parsing import GROUPS_PER_TEAM, RAW_STATS, parse_page
+from validation import (
+    InvalidGame, Quarantine, check_unplayed, validate_game
+)
+from get_season_data import parse_game_cells
+
+
+def page(seed: int = 1) -> bytes:
+    return game_page(seed, 1, "Alpha Madrid", "Beta Athens").encode()
+
+
+def game_with_team_row():
+    for seed in range(1, 50):
+        game = parse_page(page(seed))
+        if game.team_rows[0][-2] == "Team":
+            return game
+    raise AssertionError("no fixture page with a Team row")
+
+
+def set_cell(game, team: int, row: int, stat: str, value: str) -> None:
+    """Changes a cell of the parsed page, wherever its column group is"""
+    column = RAW_STATS.index(stat)
+    for group in game.stat_groups[
+        team * GROUPS_PER_TEAM:(team + 1) * GROUPS_PER_TEAM
+    ]:
+        if column < len(group[row]):
+            group[row][column] = value
+            return
+        column -= len(group[row])
+
+
+def test_valid_page_passes():
+    assert validate_game(parse_page(page())) == []
+    assert validate_game(game_with_team_row()) == []
+
+
+def test_wrong_percentage():
+    game = parse_page(page())
+    row = next(
+        i for i, row in enumerate(game.stat_groups[1]) if row[0] != "0/0"
+    )
+    set_cell(game, 0, row, "2P_Percentage", "99.9%")
+    problems = validate_game(game)
+    assert any("2P_Percentage" in problem for problem in problems)
+
+
+def test_rows_that_dont_sum_to_the_total():
+    game = parse_page(page())
+    assists = game.stat_groups[5][0][0]
+    set_cell(game, 0, 0, "Assists", str(int(assists) + 1))
+    assert validate_game(game) == [
+        "Assists of team 0 sums to "
+        f"{int(game.stat_groups[5][-1][0]) + 1}, Total is "
+        f"{game.stat_groups[5][-1][0]}"
+    ]
+
+
+def test_malformed_cell():
+    game = parse_page(page())
+    set_cell(game, 1, 0, "Points", "12a")
+    assert any("Points" in problem for problem in validate_game(game))
+
+
+def test_team_row_not_second_to_last():
+    game = game_with_team_row()
+    labels = game.team_rows[0]
+    labels[0], labels[-2] = labels[-2], labels[0]
+    problems = validate_game(game)
+    assert "team 0 has Team or Total between players" in problems
+
+
+def test_no_box_score():
+    game = parse_page(page())
+    game.stat_groups = []
+    day = date(2023, 10, 8)
+    assert check_unplayed(game, today=day + timedelta(days=1)) == [
+        f"no box score although the game was on {day}"
+    ]
+    # Before the game there is no box score yet
+    assert check_unplayed(game, today=day) == []
+
+
+def test_parser_errors_become_invalid_games():
+    broken = page().replace(b'href="/euroleague/players/', b'href="/x/', 1)
+    result = parse_game_cells(broken)
+    assert isinstance(result, InvalidGame)
+    assert result.content == broken
+    assert result.problems[0].startswith("AttributeError")
+
+
+def test_quarantine(tmp_path):
+    quarantine = Quarantine("2023", str(tmp_path))
+    invalid = InvalidGame(["a problem"], b"<html></html>")
+    quarantine.save("E2023_1", "/link/", invalid)
+    assert "E2023_1" in quarantine
+    with open(tmp_path / "2023" / "E2023_1.json") as f:
+        assert json.load(f)["problems"] == ["a problem"]
+
+
+@pytest.mark.parametrize("engine", ["bs4", "lxml"])
+def test_invalid_page_end_to_end(engine):
+    pytest.importorskip(engine)
+    content = page().replace(b"Total", b"Sum")
+    result = parse_game_cells(content, engine)
+    assert isinstance(result, InvalidGame)
+    assert "team 0 has no Total row" in result.problems